@@ -1,13 +1,26 @@
-from flask import Flask, render_template, request, jsonify, Response, send_file, session, redirect, url_for
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, jsonify, Response, send_file, session, redirect, url_for, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 import csv
 import json
 import io
+import tempfile
 import threading
-import time
-from datetime import datetime
-from scraper import FMCSAScraper
+from scraper import FMCSAScraper, SMS_BASE_URL
 from license_service import license_validator
+from license_expiry import ExpiryScheduler
+from response_cache import ResponseCache
+from job_journal import JobJournal
+from result_store import ResultStore
+from negative_index import NegativeIndex
+from census_store import CensusStore
+from change_tracker import ChangeTracker
+from exporters import EXPORT_FIELDS, write_xlsx
+from job_scheduler import JobScheduler, room_for
+from rate_limiter import RateController
+from circuit_breaker import CircuitBreaker
+from registration_resolver import RegistrationResolver
+from metrics import ScrapeMetrics, Gauge
+from http_transport import get_transport
 import os
 
 app = Flask(__name__)
@@ -20,14 +33,102 @@ CONTACT_INFO = {
     'whatsapp': '+923070467687'
 }
 
-# Global variables to manage scraping state
-scraper_instance = None
-scraping_active = False
-scraped_data = []
+# Answer logins from the local license table, kept fresh in the background
+license_validator.start_background_refresh()
 
-# Global variables for license expiry monitoring
-license_expired_keys = set()  # Track expired license keys
-expiry_monitor_running = False
+# Concurrent scan settings
+DEFAULT_WORKERS = int(os.getenv('SCRAPER_WORKERS', '1'))
+MAX_WORKERS = int(os.getenv('SCRAPER_MAX_WORKERS', '16'))
+# Threads fetching SMS/registration pages for records that pass the snapshot
+# filters; 0 means one per snapshot worker
+ENRICH_WORKERS = int(os.getenv('SCRAPER_ENRICH_WORKERS', '0'))
+
+# Shared on-disk cache of FMCSA pages so re-runs skip the network
+response_cache = ResponseCache(os.getenv('SCRAPER_CACHE_PATH', 'instance/http_cache.db'))
+
+# Persistent store of scraped records; exports and status read from here
+result_store = ResultStore(os.getenv('SCRAPER_RESULTS_PATH', 'instance/results.db'))
+
+# Journal of scan jobs so interrupted runs can resume from their checkpoint
+job_journal = JobJournal(os.getenv('SCRAPER_JOURNAL_PATH', 'instance/jobs.db'), result_store=result_store)
+
+# MC numbers that recently returned no record are skipped until they are due for a recheck
+negative_index = NegativeIndex(os.getenv('SCRAPER_NEGATIVE_INDEX_PATH', 'instance/negative_index.db'))
+RECHECK_DAYS = float(os.getenv('SCRAPER_RECHECK_DAYS', '30'))
+# 'skip' known dead numbers, or 'defer' them to the end of a bounded range
+NEGATIVE_POLICY = os.getenv('SCRAPER_NEGATIVE_POLICY', 'skip')
+
+# Bulk census loaded with `python census_store.py ingest FILE`. MC numbers it holds
+# skip the snapshot request; with SCRAPER_CENSUS_ONLY=1 the rest count as not found.
+census_store = CensusStore(os.getenv('SCRAPER_CENSUS_PATH', 'instance/census.db'))
+CENSUS_ONLY = os.getenv('SCRAPER_CENSUS_ONLY', '0') == '1'
+
+# Page hashes and records from earlier scans; incremental jobs only output what changed
+change_tracker = ChangeTracker(os.getenv('SCRAPER_SCAN_STATE_PATH', 'instance/scan_state.db'))
+
+# Progress is coalesced into a snapshot every PROGRESS_INTERVAL seconds and
+# new records are sent in data_update frames of up to PROGRESS_BATCH_SIZE
+PROGRESS_INTERVAL = float(os.getenv('SCRAPER_PROGRESS_INTERVAL', '0.5'))
+PROGRESS_BATCH_SIZE = int(os.getenv('SCRAPER_PROGRESS_BATCH_SIZE', '50'))
+
+# Host rate limits apply to the whole process, so every job shares one controller
+rate_controller = RateController()
+
+# Pause every job while an FMCSA host keeps failing, instead of burning through MC numbers
+circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('SCRAPER_BREAKER_THRESHOLD', '8')),
+    open_seconds=float(os.getenv('SCRAPER_BREAKER_OPEN_SECONDS', '30'))
+)
+# Retries for MC numbers that hit a timeout, connection error, 429 or 5xx
+MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '4'))
+
+# Registration URL patterns learned by one job help every other job
+registration_resolver = RegistrationResolver(SMS_BASE_URL)
+
+# Runs jobs for several licenses at once. MAX_RUNNING_JOBS caps concurrent jobs
+# (more are queued) and MAX_INFLIGHT_REQUESTS is split evenly between them.
+MAX_RUNNING_JOBS = int(os.getenv('SCRAPER_MAX_RUNNING_JOBS', '4'))
+MAX_INFLIGHT_REQUESTS = int(os.getenv('SCRAPER_MAX_INFLIGHT_REQUESTS', '16'))
+job_scheduler = JobScheduler(
+    socketio.emit,
+    max_running_jobs=MAX_RUNNING_JOBS,
+    max_inflight_requests=MAX_INFLIGHT_REQUESTS,
+    flush_interval=PROGRESS_INTERVAL,
+    batch_size=PROGRESS_BATCH_SIZE
+)
+# Owners whose start_scraping is between the running-job check and submit; guarded by start_lock
+start_lock = threading.Lock()
+starting_owners = set()
+
+# Stage latencies and outcomes across all jobs, served in Prometheus format from /metrics.
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" on that endpoint.
+scrape_metrics = ScrapeMetrics()
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+jobs_gauge = scrape_metrics.registry.register(Gauge('fmcsa_jobs', 'Scrape jobs by state', ('state',)))
+inflight_gauge = scrape_metrics.registry.register(Gauge('fmcsa_inflight_requests', 'Requests in flight across all jobs'))
+host_rate_gauge = scrape_metrics.registry.register(Gauge('fmcsa_host_rate', 'Current request rate per host (requests/sec)', ('host',)))
+host_responses_gauge = scrape_metrics.registry.register(Gauge('fmcsa_host_responses', 'Responses per host seen by the rate controller, by outcome', ('host', 'outcome')))
+http_connections_gauge = scrape_metrics.registry.register(Gauge('fmcsa_http_connections_opened', 'Connections opened per host since start', ('host',)))
+http_requests_gauge = scrape_metrics.registry.register(Gauge('fmcsa_http_requests', 'Requests sent per host since start', ('host',)))
+
+def license_room(license_key):
+    """Socket.IO room shared by every session logged in with a license key"""
+    return f'license-{license_key}'
+
+def on_license_expired(license_key, entry):
+    """Called by the expiry scheduler once, at the moment a license expires"""
+    print(f"License expired: {license_key} (expired on {entry.get('expiry_date', '')})")
+    job_scheduler.stop(license_key)
+    socketio.emit('license_expired', {
+        'message': 'Your license has expired. Please contact support to renew.',
+        'license_key': license_key,
+        'expiry_date': entry.get('expiry_date', '')
+    }, to=license_room(license_key))
+
+# Fires once per license at its expiry time; rescheduled whenever the license table changes
+expiry_scheduler = ExpiryScheduler(on_license_expired)
+license_validator.add_listener(expiry_scheduler.sync)
+expiry_scheduler.start()
 
 def is_authenticated():
     if not session.get('authenticated', False):
@@ -35,7 +136,7 @@ def is_authenticated():
     
     # Check if this user's license key has expired
     user_license_key = session.get('license_key', '')
-    if user_license_key in license_expired_keys:
+    if expiry_scheduler.is_expired(user_license_key):
         # Clear the session for expired users
         session.clear()
         return False
@@ -49,69 +150,6 @@ def get_user_data():
         'license_key': session.get('license_key', '')
     }
 
-def monitor_license_expiry():
-    """Background function to check license expiry every minute"""
-    global expiry_monitor_running
-    expiry_monitor_running = True
-    
-    while expiry_monitor_running:
-        try:
-            # Check licenses every 60 seconds (1 minute)
-            time.sleep(60)
-            
-            # Get all current licenses from the system
-            licenses = license_validator.get_all_licenses()
-            if not licenses:
-                continue
-            
-            current_time = datetime.now()
-            newly_expired = []
-            
-            for license_data in licenses:
-                license_key = license_data.get('license_key', '')
-                expiry_date_str = license_data.get('expiry_date', '')
-                
-                if not license_key or not expiry_date_str:
-                    continue
-                
-                try:
-                    # Parse expiry date (assuming format: YYYY-MM-DD or DD/MM/YYYY)
-                    if '/' in expiry_date_str:
-                        expiry_date = datetime.strptime(expiry_date_str, '%d/%m/%Y')
-                    else:
-                        expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%d')
-                    
-                    # Check if license has expired
-                    if current_time > expiry_date:
-                        newly_expired.append(license_key)
-                        print(f"License expired: {license_key} (expired on {expiry_date_str})")
-                        
-                        # Send expiry notification to all connected clients with this license
-                        socketio.emit('license_expired', {
-                            'message': 'Your license has expired. Please contact support to renew.',
-                            'license_key': license_key,
-                            'expiry_date': expiry_date_str
-                        }, room=None)
-                        
-                except ValueError as e:
-                    print(f"Error parsing expiry date for license {license_key}: {e}")
-                    continue
-            
-            # Update the global expired licenses set
-            license_expired_keys.update(newly_expired)
-            
-        except Exception as e:
-            print(f"Error in license expiry monitor: {e}")
-            time.sleep(30)  # Wait 30 seconds before retrying on error
-
-def start_license_expiry_monitor():
-    """Start the background license expiry monitoring thread"""
-    global expiry_monitor_running
-    if not expiry_monitor_running:
-        monitor_thread = threading.Thread(target=monitor_license_expiry, daemon=True)
-        monitor_thread.start()
-        print("License expiry monitor started")
-
 @app.route('/')
 def index():
     if not is_authenticated():
@@ -169,9 +207,6 @@ def validate_email():
         session['session_id'] = session_id
         session.pop('temp_license_key', None)  # Remove temporary key
         
-        # Start license expiry monitor if not already running
-        start_license_expiry_monitor()
-        
         return jsonify({
             'success': True, 
             'message': f'Welcome {result.get("name", "User")}! Access granted.',
@@ -185,144 +220,257 @@ def logout():
     session.clear()
     return redirect(url_for('login_page'))
 
+def current_job_id():
+    """The job whose results this session sees: its active job, else its latest one"""
+    scheduled = job_scheduler.get(session.get('license_key', ''))
+    if scheduled:
+        return scheduled.job_id
+    return session.get('job_id') or job_journal.latest_job_id(session.get('license_key', ''))
+
+@socketio.on('connect')
+def handle_connect():
+    # Re-attach a reconnecting client to its running job's events
+    if not is_authenticated():
+        return
+    # Expiry notices go only to sessions using the expiring key
+    join_room(license_room(session.get('license_key', '')))
+    scheduled = job_scheduler.get(session.get('license_key', ''))
+    if scheduled:
+        join_room(scheduled.room)
+
 @socketio.on('start_scraping')
 def handle_start_scraping(data):
     # Check if user is authenticated
     if not is_authenticated():
         emit('error', {'message': 'Access denied. Please login with your license key.'})
         return
-    global scraper_instance, scraping_active, scraped_data
     
-    if scraping_active:
-        emit('error', {'message': 'Scraping is already in progress'})
-        return
+    owner = session.get('license_key', '')
     
     try:
         start_mc = int(data['start_mc'])
         end_mc = int(data.get('end_mc', 0)) if data.get('end_mc') else None
         entity_type = data['entity_type']
-        
-        # Reset scraped data
-        scraped_data = []
-        scraping_active = True
-        
-        # Create scraper instance
-        scraper_instance = FMCSAScraper(start_mc, end_mc, entity_type)
-        
-        # Start scraping in a separate thread
-        thread = threading.Thread(target=run_scraping)
-        thread.daemon = True
-        thread.start()
-        
-        emit('scraping_started', {'message': 'Scraping started successfully'})
-        
+        workers = int(data.get('workers') or DEFAULT_WORKERS)
+        workers = max(1, min(workers, MAX_WORKERS))
+        incremental = bool(data.get('incremental'))
     except ValueError:
         emit('error', {'message': 'Invalid MC number format'})
+        return
     except Exception as e:
         emit('error', {'message': f'Error starting scraping: {str(e)}'})
-
-@socketio.on('stop_scraping')
-def handle_stop_scraping():
-    global scraping_active, scraper_instance
+        return
     
-    scraping_active = False
-    if scraper_instance:
-        scraper_instance.stop()
+    try:
+        job, message = open_journal_job(owner, start_mc, end_mc, entity_type, workers)
+    except Exception as e:
+        emit('error', {'message': f'Error starting scraping: {str(e)}'})
+        return
+    if job is None:
+        emit('error', {'message': 'Scraping is already in progress'})
+        return
     
-    emit('scraping_stopped', {'message': 'Scraping stopped'})
+    try:
+        start_job(owner, job, message, start_mc, end_mc, entity_type, workers, incremental)
+    except Exception as e:
+        job.finish('stopped')
+        emit('error', {'message': f'Error starting scraping: {str(e)}'})
+    finally:
+        with start_lock:
+            starting_owners.discard(owner)
 
-def run_scraping():
-    global scraper_instance, scraping_active, scraped_data
+def open_journal_job(owner, start_mc, end_mc, entity_type, workers):
+    """Reserve owner's start and open or create its journal job.
     
-    def on_progress(current_mc, status, data=None):
-        socketio.emit('progress_update', {
-            'current_mc': current_mc,
-            'status': status,
-            'data': data
-        })
-        
-        if data and status == 'valid':
-            scraped_data.append(data)
-            socketio.emit('data_update', {'data': data, 'total_count': len(scraped_data)})
+    Returns (None, None) if the owner already has a job running or starting.
+    The caller must release the reservation (starting_owners) when done.
+    """
+    # Two starts for one owner and range would otherwise share one journal job
+    with start_lock:
+        if owner in starting_owners or job_scheduler.get(owner):
+            return None, None
+        starting_owners.add(owner)
+        try:
+            # Continue this license's interrupted job for the same range, or start a new one
+            job = job_journal.find_resumable_job(start_mc, end_mc, entity_type, owner)
+            if job and job.resumed:
+                return job, f'Resuming previous job after MC {job.checkpoint_mc}'
+            job = job or job_journal.create_job(start_mc, end_mc, entity_type, workers, owner)
+            result_store.clear(job.job_id)
+            return job, 'Scraping started successfully'
+        except Exception:
+            starting_owners.discard(owner)
+            raise
+
+def start_job(owner, job, message, start_mc, end_mc, entity_type, workers, incremental):
+    """Replay a job's saved records to the client and schedule it"""
+    session['job_id'] = job.job_id
     
-    def on_complete():
-        global scraping_active
-        scraping_active = False
-        socketio.emit('scraping_complete', {'total_found': len(scraped_data)})
+    # Create scraper instance
+    enrich_workers = min(ENRICH_WORKERS, MAX_WORKERS) or None
+    scraper = FMCSAScraper(start_mc, end_mc, entity_type, workers=workers, enrich_workers=enrich_workers,
+                           rate_controller=rate_controller,
+                           # Incremental scans must see the live pages, not cached copies
+                           cache=None if incremental else response_cache,
+                           job=job, store=result_store, negative_index=negative_index,
+                           recheck_interval=RECHECK_DAYS * 86400, negative_policy=NEGATIVE_POLICY,
+                           metrics=scrape_metrics,
+                           registration_resolver=registration_resolver,
+                           census=census_store if census_store.count() else None, census_only=CENSUS_ONLY,
+                           tracker=change_tracker if incremental else None,
+                           circuit_breaker=circuit_breaker, max_retries=MAX_RETRIES)
+    scraped_count = result_store.count(job.job_id)
+    
+    # Only this client's room receives the job's events
+    join_room(room_for(job.job_id))
+    emit('scraping_started', {'message': message, 'total_count': scraped_count})
+    
+    # Replay records a resumed job already found
+    batch = []
+    for record in result_store.iter_records(job.job_id):
+        batch.append(record.to_dict())
+        if len(batch) >= PROGRESS_BATCH_SIZE:
+            emit('data_update', {'records': batch, 'total_count': scraped_count})
+            batch = []
+    if batch:
+        emit('data_update', {'records': batch, 'total_count': scraped_count})
     
     try:
-        scraper_instance.scrape(on_progress, on_complete)
-    except Exception as e:
-        socketio.emit('error', {'message': f'Scraping error: {str(e)}'})
-        scraping_active = False
+        job_scheduler.submit(owner, job, scraper, on_job_finished, initial_count=scraped_count)
+    except ValueError as e:
+        # Scheduler refused the job; leave it resumable instead of marked running
+        job.finish('stopped')
+        emit('error', {'message': str(e)})
+
+@socketio.on('stop_scraping')
+def handle_stop_scraping():
+    job_scheduler.stop(session.get('license_key', ''))
+    emit('scraping_stopped', {'message': 'Scraping stopped'})
+
+def on_job_finished(scheduled):
+    """Called by the scheduler on the job's thread once scraping has ended"""
+    result_store.flush()
+    negative_index.flush()
+    change_tracker.flush()
+    scheduled.job.finish('stopped' if scheduled.scraper.should_stop else 'completed')
+    pipeline = scheduled.scraper.get_pipeline_stats()
+    print(f"Job {scheduled.job_id}: enriched {pipeline['enriched']} records, "
+          f"skipped enrichment for {pipeline['enrichment_avoided']} filtered records")
+    if scheduled.scraper.tracker is not None:
+        changes = scheduled.scraper.get_change_stats()
+        print(f"Job {scheduled.job_id}: {changes['added']} added, {changes['changed']} changed, "
+              f"{changes['removed']} removed; {changes['snapshot_unchanged']} snapshots and "
+              f"{changes['registration_unchanged']} registration pages unchanged")
+    socketio.emit('scraping_complete', {'total_found': result_store.count(scheduled.job_id)}, to=scheduled.room)
 
 @app.route('/export/<format>')
 def export_data(format):
     if not is_authenticated():
         return jsonify({'error': 'Access denied. Please login with your license key.'}), 403
-    global scraped_data
     
-    if not scraped_data:
+    # Capture the job now; the streaming generators run after this request returns
+    job_id = current_job_id()
+    
+    # The change log of an incremental job includes removed records, which the result store doesn't hold
+    if format == 'changes':
+        if not job_id or not any(change_tracker.count_changes(job_id).values()):
+            return jsonify({'error': 'No changes to export'}), 400
+        return export_changes(job_id)
+    
+    if not job_id or not result_store.count(job_id):
         return jsonify({'error': 'No data to export'}), 400
     
     if format == 'csv':
-        return export_csv()
+        return export_csv(job_id)
     elif format == 'xlsx':
-        return export_xlsx()
+        return export_xlsx(job_id)
     elif format == 'txt':
-        return export_txt()
+        return export_txt(job_id)
+    elif format == 'ndjson':
+        return export_ndjson(job_id)
     else:
         return jsonify({'error': 'Invalid format'}), 400
 
-def export_csv():
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'mc_number', 'usdot_number', 'legal_name', 'physical_address', 
-        'phone_number', 'email'
-    ])
-    writer.writeheader()
-    for row in scraped_data:
-        writer.writerow(row)
-    
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=fmcsa_data.csv'}
+# Records are read in batches and written out in chunks of this many rows
+EXPORT_CHUNK_ROWS = 500
+
+def iter_export_records(job_id):
+    """Stream a job's records out of the result store as CarrierRecords"""
+    return result_store.iter_records(job_id)
+
+def stream_chunks(lines):
+    """Group generated lines into chunks so each write to the socket carries many rows"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def streaming_response(lines, mimetype, filename):
+    return Response(
+        stream_with_context(stream_chunks(lines)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
-    return response
 
-def export_xlsx():
+def export_csv(job_id):
+    def generate():
+        # Reuse one small buffer for the csv module's quoting, emptied after every row
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for record in iter_export_records(job_id):
+            writer.writerow(record.to_row(EXPORT_FIELDS))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        # Header only when the job has no rows
+        if buffer.tell():
+            yield buffer.getvalue()
+    
+    return streaming_response(generate(), 'text/csv', 'fmcsa_data.csv')
+
+def export_ndjson(job_id):
+    def generate():
+        for record in iter_export_records(job_id):
+            yield record.to_json(EXPORT_FIELDS) + '\n'
+    
+    return streaming_response(generate(), 'application/x-ndjson', 'fmcsa_data.ndjson')
+
+def export_changes(job_id):
+    def generate():
+        for change in change_tracker.iter_changes(job_id):
+            record = change['record'] or change['previous'] or {}
+            row = {'change': change['change']}
+            row.update({field: record.get(field, '') for field in EXPORT_FIELDS})
+            row['mc_number'] = change['mc_number']
+            yield json.dumps(row) + '\n'
+    
+    return streaming_response(generate(), 'application/x-ndjson', 'fmcsa_changes.ndjson')
+
+def export_xlsx(job_id):
     try:
         import openpyxl
-        from openpyxl import Workbook
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "FMCSA Data"
         
-        # Headers
-        headers = ['MC Number', 'USDOT Number', 'Legal Name', 'Physical Address', 'Phone Number', 'Email']
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Data
-        for row_num, row_data in enumerate(scraped_data, 2):
-            ws.cell(row=row_num, column=1, value=row_data.get('mc_number', ''))
-            ws.cell(row=row_num, column=2, value=row_data.get('usdot_number', ''))
-            ws.cell(row=row_num, column=3, value=row_data.get('legal_name', ''))
-            ws.cell(row=row_num, column=4, value=row_data.get('physical_address', ''))
-            ws.cell(row=row_num, column=5, value=row_data.get('phone_number', ''))
-            ws.cell(row=row_num, column=6, value=row_data.get('email', ''))
-        
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+        # Spool to a temp file that is removed once the download has been sent
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            write_xlsx(iter_export_records(job_id), path)
+            response = send_file(
+                path,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name='fmcsa_data.xlsx'
+            )
+        except Exception:
+            os.remove(path)
+            raise
         
-        response = Response(
-            output.getvalue(),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={'Content-Disposition': 'attachment; filename=fmcsa_data.xlsx'}
-        )
+        response.call_on_close(lambda: os.remove(path))
         return response
         
     except ImportError:
@@ -330,35 +478,80 @@ def export_xlsx():
     except Exception as e:
         return jsonify({'error': f'Excel export failed: {str(e)}'}), 500
 
-def export_txt():
-    output = io.StringIO()
-    output.write("FMCSA Data Export\n")
-    output.write("=" * 50 + "\n\n")
-    
-    for i, row in enumerate(scraped_data, 1):
-        output.write(f"Record {i}:\n")
-        output.write(f"MC Number: {row.get('mc_number', 'N/A')}\n")
-        output.write(f"USDOT Number: {row.get('usdot_number', 'N/A')}\n")
-        output.write(f"Legal Name: {row.get('legal_name', 'N/A')}\n")
-        output.write(f"Physical Address: {row.get('physical_address', 'N/A')}\n")
-        output.write(f"Phone Number: {row.get('phone_number', 'N/A')}\n")
-        output.write(f"Email: {row.get('email', 'N/A')}\n")
-        output.write("-" * 30 + "\n\n")
+def export_txt(job_id):
+    def generate():
+        yield "FMCSA Data Export\n"
+        yield "=" * 50 + "\n\n"
+        
+        for i, row in enumerate(iter_export_records(job_id), 1):
+            yield (
+                f"Record {i}:\n"
+                f"MC Number: {row.get('mc_number', 'N/A')}\n"
+                f"USDOT Number: {row.get('usdot_number', 'N/A')}\n"
+                f"Legal Name: {row.get('legal_name', 'N/A')}\n"
+                f"Physical Address: {row.get('physical_address', 'N/A')}\n"
+                f"Phone Number: {row.get('phone_number', 'N/A')}\n"
+                f"Email: {row.get('email', 'N/A')}\n"
+                + "-" * 30 + "\n\n"
+            )
     
-    response = Response(
-        output.getvalue(),
-        mimetype='text/plain',
-        headers={'Content-Disposition': 'attachment; filename=fmcsa_data.txt'}
-    )
-    return response
+    return streaming_response(generate(), 'text/plain', 'fmcsa_data.txt')
 
 @app.route('/status')
 def get_status():
+    scheduled = job_scheduler.get(session.get('license_key', '')) if is_authenticated() else None
+    job_id = current_job_id() if is_authenticated() else None
     return jsonify({
-        'scraping_active': scraping_active,
-        'data_count': len(scraped_data)
+        'scraping_active': scheduled is not None,
+        'job_status': scheduled.status if scheduled else None,
+        'data_count': result_store.count(job_id) if job_id else 0,
+        'rates': rate_controller.get_rates(),
+        'circuits': circuit_breaker.stats(),
+        'transport': get_transport().stats(),
+        'retries': scheduled.scraper.retry_queue.stats() if scheduled else {},
+        'cache': response_cache.stats(),
+        'parse': scheduled.scraper.get_parse_stats() if scheduled else {},
+        'pipeline': scheduled.scraper.get_pipeline_stats() if scheduled else {},
+        'changes': scheduled.scraper.get_change_stats() if scheduled and scheduled.scraper.tracker else {},
+        'registration': registration_resolver.stats(),
+        'negative_index': negative_index.stats(),
+        'census': census_store.stats(),
+        'scheduler': job_scheduler.stats()
     })
 
+@app.route('/cache/purge', methods=['POST'])
+def purge_cache():
+    if not is_authenticated():
+        return jsonify({'error': 'Access denied. Please login with your license key.'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        max_age_hours = float(data.get('max_age_hours', 24))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid max_age_hours'}), 400
+    
+    removed = response_cache.purge(max_age_hours * 3600)
+    return jsonify({'removed': removed, 'cache': response_cache.stats()})
+
+@app.route('/metrics')
+def get_metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization', '') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    
+    scheduler_stats = job_scheduler.stats()
+    jobs_gauge.set(scheduler_stats['running'], state='running')
+    jobs_gauge.set(scheduler_stats['queued'], state='queued')
+    inflight_gauge.set(scheduler_stats['inflight'])
+    for host, stats in rate_controller.get_stats().items():
+        host_rate_gauge.set(stats['rate'], host=host)
+        host_responses_gauge.set(stats['successes'], host=host, outcome='success')
+        host_responses_gauge.set(stats['failures'], host=host, outcome='failure')
+    for host, stats in get_transport().stats().items():
+        http_connections_gauge.set(stats['connections_opened'], host=host)
+        http_requests_gauge.set(stats['requests'], host=host)
+    
+    return Response(scrape_metrics.render(), content_type=scrape_metrics.registry.CONTENT_TYPE)
+
 @app.route('/health')
 def health_check():
     return jsonify({
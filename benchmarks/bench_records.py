@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Compare record dicts against slotted CarrierRecords: memory per 100k records and serialization speed.
+
+Memory is measured with tracemalloc over the records alone, so the numbers
+are per-record cost rather than process RSS.
+
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --rows 500000
+"""
+import argparse
+import csv
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carrier_record import RECORD_FIELDS, CarrierRecord
+
+STATUSES = ['ACTIVE', 'INACTIVE', 'OUT-OF-SERVICE']
+AUTHORITY = ['AUTHORIZED FOR Property', 'NOT AUTHORIZED', 'AUTHORIZED FOR Passenger']
+
+
+def scraped_fields(i):
+    """Values as the scraper produces them: every string a fresh object, like text pulled out of a page"""
+    return {
+        'mc_number': str(100000 + i),
+        'usdot_number': str(2000000 + i),
+        'legal_name': f'EXAMPLE TRUCKING {i} LLC',
+        'physical_address': f'{i % 9999} MAIN ST SPRINGFIELD, IL 62701',
+        'phone_number': f'(217) 555-{i % 10000:04d}',
+        'email': f'dispatch{i}@example.com',
+        'entity_type': ''.join(['CARR', 'IER']),
+        'usdot_status': ''.join([STATUSES[i % 3], '']),
+        'out_of_service_date': ''.join(['No', 'ne']),
+        'operating_authority_status': ''.join([AUTHORITY[i % 3], '']),
+        'sms_url': f'http://ai.fmcsa.dot.gov/SMS/Carrier/{2000000 + i}/CarrierRegistration.aspx',
+    }
+
+
+def as_dict(i):
+    return scraped_fields(i)
+
+
+def as_record(i):
+    return CarrierRecord.from_dict(scraped_fields(i))
+
+
+def measure_memory(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    records = [build(i) for i in range(rows)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    gc.collect()
+    return current, peak
+
+
+def measure_serialization(records):
+    started = time.perf_counter()
+    for record in records:
+        if isinstance(record, CarrierRecord):
+            record.to_json()
+        else:
+            json.dumps({field: record.get(field, '') for field in RECORD_FIELDS})
+    json_seconds = time.perf_counter() - started
+
+    buffer = io.StringIO()
+    started = time.perf_counter()
+    if records and isinstance(records[0], CarrierRecord):
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow(record.to_row())
+    else:
+        writer = csv.DictWriter(buffer, fieldnames=RECORD_FIELDS, extrasaction='ignore')
+        for record in records:
+            writer.writerow(record)
+    csv_seconds = time.perf_counter() - started
+    return json_seconds, csv_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    per = 100000 / args.rows
+    print(f'{args.rows} records')
+    print(f"{'layout':<16}{'MB/100k':>10}{'peak MB':>10}{'json s/100k':>13}{'csv s/100k':>12}")
+    for name, build in (('dict', as_dict), ('CarrierRecord', as_record)):
+        current, peak = measure_memory(build, args.rows)
+        records = [build(i) for i in range(args.rows)]
+        json_seconds, csv_seconds = measure_serialization(records)
+        del records
+        print(f'{name:<16}{current * per / 1e6:>10.1f}{peak / 1e6:>10.1f}'
+              f'{json_seconds * per:>13.3f}{csv_seconds * per:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
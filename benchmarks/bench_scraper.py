@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Measure FMCSAScraper throughput offline against the local FMCSA stub.
+
+The stub (benchmarks/fmcsa_stub.py) runs in this process; each case scrapes
+in a fresh process so CPU time and peak RSS belong to the scraper alone.
+
+    python benchmarks/bench_scraper.py                          # 500 MCs, 1/4/16 workers
+    python benchmarks/bench_scraper.py --count 2000 --workers 8 --latency 0.05 --error-rate 0.02
+    python benchmarks/bench_scraper.py --save baseline.json
+    python benchmarks/bench_scraper.py --compare baseline.json  # exit 1 on a regression
+
+Requests are paced at a fixed --rate per host (default 100000/s, i.e.
+unthrottled), with the AIMD adjustment pinned off, so the numbers show
+scraper cost rather than pacing. --error-rate measures recovery instead:
+every 503 the stub sends carries Retry-After: 1, which the rate controller
+honours by pausing the whole host, and the failed MC is retried with
+backoff. Throughput in that mode is dominated by those pauses and doesn't
+scale with workers; --compare only compares runs made with the same
+--rate and --error-rate.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fmcsa_stub import FMCSAStub, parse_mix
+
+START_MC = 100000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(stub_url, count, workers, parser_backend, entity_type, rate, error_rate, queue):
+    os.environ['FMCSA_SAFER_URL'] = stub_url
+    os.environ['FMCSA_SMS_URL'] = stub_url
+    # The scraper logs every skipped MC; keep the report readable
+    sys.stdout = open(os.devnull, 'w')
+    from progress_stream import classify_status
+    from rate_limiter import RateController
+    from scraper import FMCSAScraper
+
+    # Fixed rate: min_rate == max_rate, so failures don't make AIMD cut it (Retry-After still pauses)
+    rate_controller = RateController(rate=rate, min_rate=rate, max_rate=rate, burst=max(1, min(rate, 1000)))
+    scraper = FMCSAScraper(START_MC, START_MC + count - 1, entity_type, workers=workers,
+                           rate_controller=rate_controller, parser_backend=parser_backend)
+
+    started_at = {}
+    latencies = []
+    outcomes = {}
+    lock = threading.Lock()
+
+    def progress(mc_number, status, data=None):
+        now = time.perf_counter()
+        with lock:
+            if status.startswith('Checking'):
+                started_at.setdefault(mc_number, now)
+                return
+            if status.startswith('Retrying'):
+                # Not final; latency runs until the retry settles it
+                outcomes['retried'] = outcomes.get('retried', 0) + 1
+                return
+            latencies.append(now - started_at.pop(mc_number, now))
+            outcome = classify_status(status)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    scraper.scrape(progress, lambda: None)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    latencies.sort()
+    records = outcomes.get('valid', 0)
+    queue.put({
+        'workers': workers,
+        'count': count,
+        'rate': rate,
+        'error_rate': error_rate,
+        'seconds': elapsed,
+        'mc_per_sec': count / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cpu_ms_per_record': cpu * 1000 / records if records else 0.0,
+        'cpu_ms_per_mc': cpu * 1000 / count,
+        'peak_mb': peak / 1024,
+        'delta_mb': (peak - baseline) / 1024,
+        'outcomes': outcomes,
+        'enrichment_avoided': scraper.get_pipeline_stats()['enrichment_avoided'],
+    })
+
+
+def compare(results, baseline_path, tolerance):
+    """Print regressions against a saved run. Returns True if any were found."""
+    with open(baseline_path) as f:
+        baseline = {case['workers']: case for case in json.load(f)}
+
+    regressed = False
+    for case in results:
+        before = baseline.get(case['workers'])
+        if before is None:
+            continue
+        # Baselines saved before these fields existed used the defaults
+        settings = (before.get('rate', 100000.0), before.get('error_rate', 0.0))
+        if settings != (case['rate'], case['error_rate']):
+            print(f"workers={case['workers']}: baseline used rate={settings[0]} error_rate={settings[1]}; not compared")
+            continue
+        checks = [
+            ('mc_per_sec', case['mc_per_sec'] < before['mc_per_sec'] * (1 - tolerance)),
+            ('p95_ms', case['p95_ms'] > before['p95_ms'] * (1 + tolerance)),
+            ('cpu_ms_per_mc', case['cpu_ms_per_mc'] > before['cpu_ms_per_mc'] * (1 + tolerance)),
+            ('peak_mb', case['peak_mb'] > before['peak_mb'] * (1 + tolerance)),
+        ]
+        for metric, worse in checks:
+            if worse:
+                regressed = True
+                print(f"REGRESSION workers={case['workers']} {metric}: {before[metric]:.2f} -> {case[metric]:.2f}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=500, help='MC numbers per case')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--parser', dest='parser_backend', help='HTML parser backend (see parsers.py)')
+    parser.add_argument('--latency', type=float, default=0.01, help='Stub response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of stub responses that are 503s (measures retry recovery, see above)')
+    parser.add_argument('--rate', type=float, default=100000.0, help='Fixed requests per second per host')
+    parser.add_argument('--entity-type', default='Carrier', help='Entity type filter (the stub serves carriers)')
+    parser.add_argument('--mix', type=parse_mix, help='Snapshot variant weights, e.g. valid=0.5,not_found=0.5')
+    parser.add_argument('--save', help='Write results as JSON')
+    parser.add_argument('--compare', help='Compare against a JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown for --compare')
+    args = parser.parse_args()
+
+    stub = FMCSAStub(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, mix=args.mix).start()
+    print(f"stub {stub.url}  latency {args.latency * 1000:.0f}ms  error rate {args.error_rate:.1%}")
+    print(f"{'workers':>7} {'MC/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'cpu ms/rec':>10} {'peak RSS MB':>12} {'+RSS MB':>8}  outcomes")
+
+    results = []
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        for workers in args.workers:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_case, args=(stub.url, args.count, workers, args.parser_backend,
+                                                         args.entity_type, args.rate, args.error_rate, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            results.append(result)
+            outcomes = ' '.join(f'{name}={n}' for name, n in sorted(result['outcomes'].items()))
+            outcomes += f"  enrichment_avoided={result['enrichment_avoided']}"
+            print(f"{workers:>7} {result['mc_per_sec']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['cpu_ms_per_record']:>10.2f} {result['peak_mb']:>12.1f} "
+                  f"{result['delta_mb']:>8.1f}  {outcomes}")
+    finally:
+        stub.stop()
+    print(f"stub requests: {stub.stats}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare the write-only XLSX export against the previous cell-by-cell export.
+
+Each case runs in a fresh process so peak RSS reflects that case alone.
+
+    python benchmarks/bench_xlsx_export.py                 # 10k, 100k, 500k rows
+    python benchmarks/bench_xlsx_export.py --rows 10000
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carrier_record import CarrierRecord
+from exporters import EXPORT_FIELDS, XLSX_HEADERS, write_xlsx
+
+
+def make_records(count):
+    for i in range(count):
+        yield CarrierRecord.from_dict({
+            'mc_number': str(100000 + i),
+            'usdot_number': str(2000000 + i),
+            'legal_name': f'EXAMPLE TRUCKING {i} LLC',
+            'physical_address': f'{i % 9999} MAIN ST SPRINGFIELD, IL 62701',
+            'phone_number': '(217) 555-0100',
+            'email': f'dispatch{i}@example.com',
+        })
+
+
+def legacy_export(records):
+    """The export_xlsx implementation this benchmark replaces"""
+    from openpyxl import Workbook
+
+    records = list(records)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "FMCSA Data"
+
+    for col, header in enumerate(XLSX_HEADERS, 1):
+        ws.cell(row=1, column=col, value=header)
+
+    for row_num, row_data in enumerate(records, 2):
+        for col, field in enumerate(EXPORT_FIELDS, 1):
+            ws.cell(row=row_num, column=col, value=row_data.get(field, ''))
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return len(output.getvalue())
+
+
+def streaming_export(records):
+    scratch = tempfile.mkdtemp()
+    path = os.path.join(scratch, 'export.xlsx')
+    write_xlsx(records, path)
+    size = os.path.getsize(path)
+    os.remove(path)
+    os.rmdir(scratch)
+    return size
+
+
+def run_case(name, rows, queue):
+    export = legacy_export if name == 'legacy' else streaming_export
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    size = export(make_records(rows))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({'seconds': elapsed, 'cpu': cpu, 'peak_mb': peak / 1024, 'delta_mb': (peak - baseline) / 1024, 'bytes': size})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--only', choices=['legacy', 'streaming'], help='Run a single implementation')
+    args = parser.parse_args()
+
+    names = [args.only] if args.only else ['legacy', 'streaming']
+    print(f"{'rows':>8}  {'impl':<10} {'wall s':>8} {'cpu s':>8} {'peak RSS MB':>12} {'+RSS MB':>9} {'size MB':>8}")
+
+    ctx = multiprocessing.get_context('spawn')
+    for rows in args.rows:
+        for name in names:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_case, args=(name, rows, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            print(f"{rows:>8}  {name:<10} {result['seconds']:>8.2f} {result['cpu']:>8.2f} "
+                  f"{result['peak_mb']:>12.1f} {result['delta_mb']:>9.1f} {result['bytes'] / 1e6:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
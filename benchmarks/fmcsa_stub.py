@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Local stand-in for the FMCSA sites, serving the recorded pages in fixtures/safer.
+
+    python benchmarks/fmcsa_stub.py --port 8099 --latency 0.05 --error-rate 0.01
+
+Point a scraper at it with FMCSA_SAFER_URL and FMCSA_SMS_URL set to the
+printed URL. Each MC number maps to a fixed snapshot variant (valid,
+not_found, inactive or mismatch) in the proportions given by --mix, so runs
+are repeatable. The valid snapshot links on to the SMS and registration pages
+for USDOT 1000000 + MC.
+"""
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'safer')
+
+# Identifiers baked into the recorded pages
+FIXTURE_MC = b'123456'
+FIXTURE_DOT = b'1234567'
+FIXTURE_SMS_HOST = b'http://ai.fmcsa.dot.gov'
+
+DEFAULT_MIX = {'valid': 0.4, 'not_found': 0.4, 'inactive': 0.1, 'mismatch': 0.1}
+
+REGISTRATION_PATH = re.compile(r'^/SMS/Carrier/(\d+)/CarrierRegistration\.aspx$')
+
+
+def load_fixtures():
+    fixtures = {}
+    for name in ('snapshot_valid', 'snapshot_not_found', 'snapshot_inactive', 'snapshot_mismatch',
+                 'sms_carrier', 'registration'):
+        with open(os.path.join(FIXTURE_DIR, name + '.html'), 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def parse_mix(text):
+    """Parse 'valid=0.5,not_found=0.5' into a mix dict"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f'Unknown snapshot variant: {name}')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class FMCSAStub:
+    """Threaded HTTP server answering SAFER snapshot, SMS and registration requests.
+
+    latency and jitter (seconds) delay every response; error_rate is the
+    fraction of requests answered with 503 and a Retry-After of one second.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, mix=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fixtures = load_fixtures()
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = {'snapshot': 0, 'sms': 0, 'registration': 0, 'errors': 0, 'not_found': 0}
+        self.stats_lock = threading.Lock()
+
+        # Cumulative thresholds over [0, 1) for picking a variant from the MC number
+        mix = mix or DEFAULT_MIX
+        total = sum(mix.values())
+        self.thresholds = []
+        running = 0.0
+        for variant, weight in mix.items():
+            running += weight / total
+            self.thresholds.append((running, variant))
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def do_POST(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def variant_for(self, mc_number):
+        # Knuth multiplicative hash spreads consecutive MC numbers across variants
+        position = (mc_number * 2654435761 % 2 ** 32) / 2 ** 32
+        for threshold, variant in self.thresholds:
+            if position < threshold:
+                return variant
+        return self.thresholds[-1][1]
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def handle(self, request):
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length else b''
+
+        with self.random_lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            fail = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            self.count('errors')
+            return self.respond(request, 503, b'Service Unavailable', {'Retry-After': '1'})
+
+        parts = urlsplit(request.path)
+        if parts.path == '/query.asp':
+            params = parse_qs(body.decode('latin-1')) if request.command == 'POST' else parse_qs(parts.query)
+            return self.snapshot(request, params.get('query_string', [''])[0])
+        if parts.path.lower() == '/sms/safer_xfr.aspx':
+            self.count('sms')
+            dot = parse_qs(parts.query).get('DOT', ['0'])[0].encode()
+            return self.respond(request, 200, self.fixtures['sms_carrier'].replace(FIXTURE_DOT, dot))
+        match = REGISTRATION_PATH.match(parts.path)
+        if match:
+            self.count('registration')
+            return self.respond(request, 200, self.fixtures['registration'].replace(FIXTURE_DOT, match.group(1).encode()))
+
+        self.count('not_found')
+        return self.respond(request, 404, b'Not Found')
+
+    def snapshot(self, request, query_string):
+        self.count('snapshot')
+        if not query_string.isdigit():
+            return self.respond(request, 200, self.fixtures['snapshot_not_found'])
+
+        mc_number = int(query_string)
+        variant = self.variant_for(mc_number)
+        page = self.fixtures['snapshot_' + variant]
+        if variant in ('valid', 'mismatch'):
+            dot = str(1000000 + mc_number).encode()
+            # Swap the USDOT number out first, since the fixture MC is a prefix of it
+            page = page.replace(FIXTURE_DOT, b'\0DOT\0')
+            if variant == 'valid':
+                page = page.replace(FIXTURE_MC, str(mc_number).encode())
+            page = page.replace(b'\0DOT\0', dot).replace(FIXTURE_SMS_HOST, self.url.encode())
+        return self.respond(request, 200, page)
+
+    def respond(self, request, status, body, headers=None):
+        request.send_response(status)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- seconds around --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--mix', type=parse_mix, help='Snapshot variant weights, e.g. valid=0.5,not_found=0.5')
+    args = parser.parse_args()
+
+    stub = FMCSAStub(args.host, args.port, args.latency, args.jitter, args.error_rate, args.mix)
+    print(f'FMCSA stub listening on {stub.url}')
+    print(f'  FMCSA_SAFER_URL={stub.url} FMCSA_SMS_URL={stub.url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
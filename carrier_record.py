@@ -0,0 +1,129 @@
+import json
+import sys
+
+# Columns stored for every record, in export order
+RECORD_FIELDS = [
+    'mc_number', 'usdot_number', 'legal_name', 'physical_address', 'phone_number',
+    'email', 'entity_type', 'usdot_status', 'out_of_service_date', 'operating_authority_status'
+]
+
+# Fields drawn from a small set of values (CARRIER, ACTIVE, AUTHORIZED FOR Property...);
+# interning makes every record share one copy of each
+INTERNED_FIELDS = frozenset(['entity_type', 'usdot_status', 'out_of_service_date', 'operating_authority_status'])
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _clean(value):
+    return '' if value is None else str(value)
+
+
+class CarrierRecord:
+    """One scraped carrier, stored in slots instead of a per-record dict.
+
+    Holds exactly RECORD_FIELDS as strings ('' when missing); scraper-only
+    keys such as sms_url are dropped. It reads like a dict (get, [],
+    keys, items), so code that consumed record dicts keeps working, and it
+    serializes straight to a JSON line or CSV row without building a dict
+    first. Use to_dict() where a real dict is needed, e.g. Socket.IO
+    payloads.
+    """
+
+    __slots__ = tuple(RECORD_FIELDS)
+
+    def __init__(self, *values):
+        for field, value in zip(RECORD_FIELDS, values):
+            value = _clean(value)
+            object.__setattr__(self, field, sys.intern(value) if field in INTERNED_FIELDS else value)
+        for field in RECORD_FIELDS[len(values):]:
+            object.__setattr__(self, field, '')
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*[data.get(field) for field in RECORD_FIELDS])
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a sequence of values in RECORD_FIELDS order, e.g. a result store row"""
+        return cls(*row)
+
+    def __setattr__(self, field, value):
+        value = _clean(value)
+        object.__setattr__(self, field, sys.intern(value) if field in INTERNED_FIELDS else value)
+
+    def get(self, field, default=None):
+        if field in INDEX:
+            return getattr(self, field)
+        return default
+
+    def __getitem__(self, field):
+        if field not in INDEX:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in INDEX:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field):
+        return field in INDEX
+
+    def __iter__(self):
+        return iter(RECORD_FIELDS)
+
+    def __len__(self):
+        return len(RECORD_FIELDS)
+
+    def keys(self):
+        return list(RECORD_FIELDS)
+
+    def values(self):
+        return [getattr(self, field) for field in RECORD_FIELDS]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in RECORD_FIELDS]
+
+    def __eq__(self, other):
+        if isinstance(other, CarrierRecord):
+            return self.values() == other.values()
+        return NotImplemented
+
+    def __repr__(self):
+        return f'CarrierRecord(mc_number={self.mc_number!r}, legal_name={self.legal_name!r})'
+
+    def to_dict(self, fields=RECORD_FIELDS):
+        return {field: getattr(self, field) for field in fields}
+
+    def to_row(self, fields=RECORD_FIELDS):
+        return [getattr(self, field) for field in fields]
+
+    def to_json(self, fields=RECORD_FIELDS):
+        """The record as a JSON object string; all values are strings, so each is encoded directly"""
+        if fields is RECORD_FIELDS:
+            values = [getattr(self, field) for field in fields]
+            prefixes = JSON_PREFIXES
+        elif fields:
+            values = [self.get(field, '') for field in fields]
+            prefixes = _json_prefixes(fields)
+        else:
+            return '{}'
+        return ''.join([prefix + _encode_string(value) for prefix, value in zip(prefixes, values)]) + '}'
+
+
+def _json_prefixes(fields):
+    # '{"mc_number": ', ', "usdot_number": ', ... so a record is one join of prefix + value pairs
+    return ['{"' + fields[0] + '": '] + [', "' + field + '": ' for field in fields[1:]]
+
+
+INDEX = frozenset(RECORD_FIELDS)
+JSON_PREFIXES = _json_prefixes(RECORD_FIELDS)
+
+
+def record_to_json(record, fields=None):
+    """JSON for a CarrierRecord or a plain record dict, limited to fields if given"""
+    if isinstance(record, CarrierRecord):
+        return record.to_json(fields or RECORD_FIELDS)
+    if fields:
+        record = {field: record.get(field, '') for field in fields}
+    return json.dumps(record)
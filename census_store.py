@@ -0,0 +1,272 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from result_store import RECORD_FIELDS, extract_state
+
+# Census header names accepted for each field, matched case-insensitively.
+# FMCSA has shipped the census with several layouts over the years.
+CENSUS_COLUMNS = {
+    'mc_number': ['mc_number', 'mc_mx_ff_number', 'docket_number'],
+    'usdot_number': ['dot_number', 'usdot_number', 'usdot'],
+    'legal_name': ['legal_name', 'name'],
+    'phone_number': ['telephone', 'phone', 'phone_number'],
+    'email': ['email_address', 'email'],
+    'entity_type': ['entity_type', 'carship'],
+    'usdot_status': ['usdot_status', 'status_code', 'status'],
+    'out_of_service_date': ['out_of_service_date', 'oos_date'],
+    'operating_authority_status': ['operating_authority_status', 'authority_status'],
+    'phy_street': ['phy_street', 'physical_street'],
+    'phy_city': ['phy_city', 'physical_city'],
+    'phy_state': ['phy_state', 'physical_state'],
+    'phy_zip': ['phy_zip', 'physical_zip'],
+    # Newer files carry dockets as prefix/number pairs instead of an MC column
+    'docket_prefix': ['docket1prefix', 'docket1_prefix'],
+    'docket': ['docket1'],
+}
+
+# Single-letter codes used by some census layouts
+ENTITY_CODES = {'C': 'CARRIER', 'S': 'SHIPPER', 'B': 'BROKER', 'R': 'REGISTRANT', 'I': 'INTERMODAL EQUIPMENT PROVIDER'}
+STATUS_CODES = {'A': 'ACTIVE', 'I': 'INACTIVE'}
+
+
+def open_census(path):
+    """Open a census CSV for streaming text reads, gunzipping it if needed"""
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    raw = gzip.open(path, 'rb') if gzipped else open(path, 'rb')
+    return io.TextIOWrapper(raw, encoding='utf-8', errors='replace', newline='')
+
+
+def _column_map(header):
+    """Map each census field to its column index in this file's header"""
+    positions = {name.strip().lower(): index for index, name in enumerate(header)}
+    columns = {}
+    for field, aliases in CENSUS_COLUMNS.items():
+        for alias in aliases:
+            if alias in positions:
+                columns[field] = positions[alias]
+                break
+    return columns
+
+
+def census_row_to_record(row, columns):
+    """Convert a census CSV row into a record in FMCSAScraper's schema, or None if it has no MC number"""
+    def get(field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    mc_number = get('mc_number')
+    if not mc_number and get('docket_prefix').upper() in ('MC', 'MX'):
+        mc_number = get('docket')
+    mc_number = mc_number.upper().replace('MC', '').replace('-', '').strip()
+    if not mc_number.isdigit():
+        return None
+
+    entity_type = get('entity_type')
+    entity_type = ', '.join(ENTITY_CODES.get(code.strip(), code.strip()) for code in entity_type.split(',') if code.strip())
+    usdot_status = get('usdot_status')
+
+    city_line = ' '.join(part for part in (get('phy_state'), get('phy_zip')) if part)
+    if get('phy_city'):
+        city_line = f"{get('phy_city')}, {city_line}" if city_line else get('phy_city')
+
+    return {
+        'mc_number': str(int(mc_number)),
+        'usdot_number': get('usdot_number'),
+        'legal_name': get('legal_name'),
+        'physical_address': ' '.join(part for part in (get('phy_street'), city_line) if part),
+        'phone_number': get('phone_number'),
+        'email': get('email'),
+        'entity_type': entity_type.upper(),
+        'usdot_status': STATUS_CODES.get(usdot_status.upper(), usdot_status.upper()),
+        'out_of_service_date': get('out_of_service_date'),
+        'operating_authority_status': get('operating_authority_status'),
+    }
+
+
+class CensusStore:
+    """Local indexed copy of an FMCSA bulk carrier census, keyed by MC number.
+
+    ingest() streams the file row by row and writes it in batches, so memory
+    stays flat however large the census is. Records come back in the same
+    schema FMCSAScraper produces, so they can be filtered with
+    is_valid_record and enriched like scraped ones.
+    """
+
+    def __init__(self, path='instance/census.db'):
+        self.path = path
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        columns = ', '.join(f"{field} TEXT NOT NULL DEFAULT ''" for field in RECORD_FIELDS)
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS census (
+                mc_int INTEGER PRIMARY KEY,
+                {columns},
+                state TEXT NOT NULL DEFAULT ''
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_census_usdot ON census (usdot_number)')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS census_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def ingest(self, path, batch_size=5000, progress=None):
+        """Load a census CSV (optionally gzipped) into the store.
+
+        Rows replace earlier entries for the same MC number, so re-ingesting a
+        newer file updates in place. Returns counts of rows read, loaded and
+        skipped for lacking an MC number.
+        """
+        stats = {'rows': 0, 'loaded': 0, 'skipped': 0}
+        started = time.time()
+        insert = (
+            f"INSERT OR REPLACE INTO census (mc_int, {', '.join(RECORD_FIELDS)}, state) "
+            f"VALUES ({', '.join('?' for _ in range(len(RECORD_FIELDS) + 2))})"
+        )
+
+        with open_census(path) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return stats
+            columns = _column_map(header)
+            if 'mc_number' not in columns and 'docket' not in columns:
+                raise ValueError('Census file has no MC number or docket column')
+
+            batch = []
+            for row in reader:
+                stats['rows'] += 1
+                record = census_row_to_record(row, columns)
+                if record is None:
+                    stats['skipped'] += 1
+                    continue
+
+                batch.append([int(record['mc_number'])] + [record[field] for field in RECORD_FIELDS]
+                             + [extract_state(record['physical_address'])])
+                if len(batch) >= batch_size:
+                    self._write(insert, batch)
+                    stats['loaded'] += len(batch)
+                    batch = []
+                    if progress:
+                        progress(stats)
+
+            if batch:
+                self._write(insert, batch)
+                stats['loaded'] += len(batch)
+
+        with self.lock:
+            # Counted once here so count() and stats() never scan millions of rows
+            records = self.conn.execute('SELECT COUNT(*) FROM census').fetchone()[0]
+            self.conn.execute(
+                'INSERT OR REPLACE INTO census_meta (key, value) VALUES (?, ?), (?, ?), (?, ?)',
+                ('source', os.path.basename(path), 'ingested_at', str(started), 'records', str(records))
+            )
+            self.conn.commit()
+        return stats
+
+    def _write(self, insert, batch):
+        with self.lock:
+            self.conn.executemany(insert, batch)
+            self.conn.commit()
+
+    def get(self, mc_number):
+        """Census record for an MC number, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(RECORD_FIELDS)} FROM census WHERE mc_int = ?", (int(mc_number),)
+            ).fetchone()
+        return dict(zip(RECORD_FIELDS, row)) if row else None
+
+    def iter_range(self, start_mc, end_mc=None, batch_size=1000):
+        """Yield census records with start_mc <= MC <= end_mc in MC order, batch_size rows at a time"""
+        last_mc = start_mc - 1
+        upper = end_mc if end_mc is not None else sys.maxsize
+        while True:
+            # Keyset pagination so each batch is an index seek and no cursor stays open
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT mc_int, {', '.join(RECORD_FIELDS)} FROM census "
+                    'WHERE mc_int > ? AND mc_int <= ? ORDER BY mc_int LIMIT ?',
+                    (last_mc, upper, batch_size)
+                ).fetchall()
+
+            if not rows:
+                return
+
+            for row in rows:
+                yield dict(zip(RECORD_FIELDS, row[1:]))
+            last_mc = rows[-1][0]
+
+    def count(self):
+        """Records in the census, as counted at the last ingest"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM census_meta WHERE key = 'records'").fetchone()
+            if row is not None:
+                return int(row[0])
+            # Stores ingested before the count was kept: count once and remember it
+            records = self.conn.execute('SELECT COUNT(*) FROM census').fetchone()[0]
+            self.conn.execute("INSERT OR REPLACE INTO census_meta (key, value) VALUES ('records', ?)", (str(records),))
+            self.conn.commit()
+            return records
+
+    def stats(self):
+        with self.lock:
+            meta = dict(self.conn.execute('SELECT key, value FROM census_meta').fetchall())
+        return {
+            'records': self.count(),
+            'source': meta.get('source', ''),
+            'ingested_at': float(meta['ingested_at']) if 'ingested_at' in meta else None,
+        }
+
+
+def main(argv):
+    """python census_store.py ingest FILE [DB] | query START_MC [END_MC] [DB] [--entity-type TYPE]"""
+    parser = argparse.ArgumentParser(description='Load the FMCSA census and query it offline')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='Load a census CSV (optionally gzipped)')
+    ingest.add_argument('file')
+    ingest.add_argument('db', nargs='?')
+    query = commands.add_parser('query', help='Write the census records a scan would keep as CSV')
+    query.add_argument('start_mc', type=int)
+    query.add_argument('end_mc', type=int, nargs='?')
+    query.add_argument('db', nargs='?')
+    query.add_argument('--entity-type', default='Carrier', choices=['Carrier', 'Broker', 'Shipper'])
+    args = parser.parse_args(argv)
+
+    store = CensusStore(args.db or os.getenv('SCRAPER_CENSUS_PATH', 'instance/census.db'))
+    if args.command == 'ingest':
+        stats = store.ingest(args.file, progress=lambda s: print(f"  {s['loaded']} records loaded...", file=sys.stderr))
+        print(f"Read {stats['rows']} rows: {stats['loaded']} loaded, {stats['skipped']} without an MC number")
+        return 0
+
+    # The scraper's filters: inactive census rows are ruled out, then is_valid_record applies
+    from scraper import is_valid_record
+
+    writer = csv.DictWriter(sys.stdout, fieldnames=RECORD_FIELDS)
+    writer.writeheader()
+    for record in store.iter_range(args.start_mc, args.end_mc):
+        if record.get('usdot_status', '').upper() == 'INACTIVE' or not is_valid_record(record, args.entity_type):
+            continue
+        writer.writerow(record)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from carrier_record import RECORD_FIELDS, record_to_json
+
+CHANGE_TYPES = ('added', 'changed', 'removed')
+
+
+def page_hash(content):
+    """Short digest of a page body, used to tell whether it changed since the last scan"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def record_hash(record):
+    return hashlib.blake2b(
+        json.dumps([str(record.get(field) or '') for field in RECORD_FIELDS]).encode(), digest_size=16
+    ).hexdigest()
+
+
+def _loads(value):
+    return json.loads(value) if value is not None else None
+
+
+class ChangeTracker:
+    """Per-MC page state from earlier scans, for incremental re-scans.
+
+    For every MC number scanned under a scope (the entity type filter) it
+    keeps the snapshot and registration page hashes, the registration
+    page's ETag/Last-Modified validators, what was extracted from each page
+    and the resulting record. A re-scan uses that to skip re-parsing
+    unchanged pages, and update() reports whether the record was added,
+    changed or removed relative to the previous scan. Changes are logged per
+    run so they can be exported on their own.
+    """
+
+    def __init__(self, path='instance/scan_state.db', commit_every=200, commit_interval=2.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending_writes = 0
+        self.last_commit = time.monotonic()
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_state (
+                scope TEXT NOT NULL,
+                mc_int INTEGER NOT NULL,
+                snapshot_hash TEXT,
+                snapshot_data TEXT,
+                registration_url TEXT,
+                registration_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                registration_fields TEXT,
+                record_hash TEXT,
+                record TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, mc_int)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_changes (
+                run_id INTEGER NOT NULL,
+                mc_int INTEGER NOT NULL,
+                change TEXT NOT NULL,
+                record TEXT,
+                previous TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (run_id, mc_int)
+            )
+        ''')
+        self.conn.commit()
+
+    def get(self, scope, mc_number):
+        """Stored state for an MC number, or None if it was never scanned under this scope"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT snapshot_hash, snapshot_data, registration_url, registration_hash, etag, last_modified, '
+                'registration_fields, record_hash, record FROM scan_state WHERE scope = ? AND mc_int = ?',
+                (scope, int(mc_number))
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'snapshot_hash': row[0],
+            'snapshot_data': _loads(row[1]),
+            'registration_url': row[2],
+            'registration_hash': row[3],
+            'etag': row[4],
+            'last_modified': row[5],
+            'registration_fields': _loads(row[6]),
+            'record_hash': row[7],
+            'record': _loads(row[8]),
+        }
+
+    def update(self, run_id, scope, mc_number, pages, record):
+        """Store this scan's pages and record for an MC number.
+
+        pages holds whatever page state was gathered (see FMCSAScraper.note_pages);
+        record is the valid record, or None if the MC no longer yields one.
+        Returns 'added', 'changed', 'removed' or 'unchanged'.
+        """
+        previous = self.get(scope, mc_number)
+        new_hash = record_hash(record) if record else None
+        old_hash = previous['record_hash'] if previous else None
+
+        if new_hash and not old_hash:
+            change = 'added'
+        elif new_hash and new_hash != old_hash:
+            change = 'changed'
+        elif old_hash and not new_hash:
+            change = 'removed'
+        else:
+            change = 'unchanged'
+
+        state = dict(previous or {})
+        state.update(pages)
+        if 'snapshot_hash' in pages and 'registration_hash' not in pages:
+            # The snapshot was refetched but enrichment didn't run; drop stale registration state
+            for key in ('registration_url', 'registration_hash', 'etag', 'last_modified', 'registration_fields'):
+                state[key] = None
+
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO scan_state (scope, mc_int, snapshot_hash, snapshot_data, registration_url, '
+                'registration_hash, etag, last_modified, registration_fields, record_hash, record, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (scope, int(mc_number), state.get('snapshot_hash'), json.dumps(state.get('snapshot_data')),
+                 state.get('registration_url'), state.get('registration_hash'), state.get('etag'),
+                 state.get('last_modified'), json.dumps(state.get('registration_fields')),
+                 new_hash, record_to_json(record) if record else None, time.time())
+            )
+            if change != 'unchanged':
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO scan_changes (run_id, mc_int, change, record, previous, recorded_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (run_id, int(mc_number), change, record_to_json(record) if record else None,
+                     json.dumps(previous['record']) if previous and previous['record'] else None, time.time())
+                )
+            self.pending_writes += 1
+
+            # Batch commits like the job journal; a lost batch is just rescanned
+            now = time.monotonic()
+            if self.pending_writes >= self.commit_every or now - self.last_commit >= self.commit_interval:
+                self._commit(now)
+        return change
+
+    def iter_changes(self, run_id, batch_size=1000):
+        """Yield {change, mc_number, record, previous} for a run in MC order"""
+        last_mc = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    'SELECT mc_int, change, record, previous FROM scan_changes '
+                    'WHERE run_id = ? AND mc_int > ? ORDER BY mc_int LIMIT ?',
+                    (run_id, last_mc, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for mc_int, change, record, previous in rows:
+                yield {'change': change, 'mc_number': str(mc_int), 'record': _loads(record), 'previous': _loads(previous)}
+            last_mc = rows[-1][0]
+
+    def count_changes(self, run_id):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT change, COUNT(*) FROM scan_changes WHERE run_id = ? GROUP BY change', (run_id,)
+            ).fetchall()
+        counts = {change: 0 for change in CHANGE_TYPES}
+        counts.update(dict(rows))
+        return counts
+
+    def flush(self):
+        with self.lock:
+            self._commit(time.monotonic())
+
+    def _commit(self, now):
+        self.conn.commit()
+        self.pending_writes = 0
+        self.last_commit = now
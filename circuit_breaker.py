@@ -0,0 +1,109 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostCircuit:
+    """Breaker state for one host: closed, open (requests held) or half-open (one probe allowed)"""
+
+    def __init__(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.open_seconds = 0.0
+        self.probe_started = None
+        self.opened = 0
+
+
+class CircuitBreaker:
+    """Pauses requests to a host after a run of transient failures.
+
+    After failure_threshold consecutive timeouts, connection errors or
+    429/5xx responses the host's circuit opens: allow() holds every request to
+    it for open_seconds, so a scan waits out an FMCSA outage instead of
+    running through thousands of MC numbers that would all fail. Then one
+    probe request is let through; success closes the circuit, failure reopens
+    it for twice as long, up to max_open_seconds. One breaker is meant to be
+    shared by every scraper in the process, like the RateController.
+    """
+
+    def __init__(self, failure_threshold=8, open_seconds=30.0, max_open_seconds=600.0):
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.circuits = {}
+        self.lock = threading.Lock()
+
+    def _circuit(self, url):
+        host = urlparse(url).netloc.lower()
+        circuit = self.circuits.get(host)
+        if circuit is None:
+            circuit = self.circuits[host] = HostCircuit()
+        return host, circuit
+
+    def allow(self, url, stop_event=None):
+        """Block while the host's circuit is open. Returns False if stop_event fires first."""
+        while True:
+            with self.lock:
+                _, circuit = self._circuit(url)
+                now = time.monotonic()
+                if circuit.state == 'closed':
+                    return True
+                if now >= circuit.open_until:
+                    # One probe at a time; a probe that never reported back is replaced after a while
+                    if circuit.probe_started is None or now - circuit.probe_started > circuit.open_seconds:
+                        circuit.state = 'half_open'
+                        circuit.probe_started = now
+                        return True
+                    wait_time = 0.5
+                else:
+                    wait_time = circuit.open_until - now
+
+            wait_time = min(wait_time, 1.0)
+            if stop_event is not None:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+    def record_success(self, url):
+        with self.lock:
+            host, circuit = self._circuit(url)
+            if circuit.state != 'closed':
+                print(f'Circuit closed for {host}: requests resumed')
+            circuit.state = 'closed'
+            circuit.consecutive_failures = 0
+            circuit.open_seconds = 0.0
+            circuit.probe_started = None
+
+    def record_failure(self, url):
+        with self.lock:
+            host, circuit = self._circuit(url)
+            now = time.monotonic()
+            circuit.consecutive_failures += 1
+            if circuit.state == 'half_open':
+                # The probe failed: stay open, backing off further
+                circuit.open_seconds = min(self.max_open_seconds, circuit.open_seconds * 2)
+            elif circuit.state == 'closed' and circuit.consecutive_failures >= self.failure_threshold:
+                circuit.open_seconds = self.base_open_seconds
+                circuit.opened += 1
+            else:
+                return
+            circuit.state = 'open'
+            circuit.open_until = now + circuit.open_seconds
+            circuit.probe_started = None
+            print(f'Circuit open for {host} after {circuit.consecutive_failures} consecutive failures; '
+                  f'pausing requests for {circuit.open_seconds:.0f}s')
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                host: {
+                    'state': circuit.state,
+                    'consecutive_failures': circuit.consecutive_failures,
+                    'opened': circuit.opened,
+                    'reopens_in': round(max(0.0, circuit.open_until - now), 1) if circuit.state == 'open' else 0.0,
+                }
+                for host, circuit in self.circuits.items()
+            }
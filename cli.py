@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Run FMCSAScraper from the command line, without the web app.
+
+Valid records are written as JSON lines to stdout (or --output) as they are
+found; scraper logs and the throughput summary go to stderr. With
+--incremental, carriers removed since the last scan follow at the end as
+{"change": "removed", "mc_number": ...} lines.
+
+    python cli.py --start 100000 --end 110000 --workers 8 > carriers.jsonl
+    python cli.py --input mc_numbers.txt --entity-type Broker --output brokers.jsonl
+    python cli.py --queue sqlite:////shared/work_queue.db --workers 8 --node-id node-1
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from progress_stream import classify_status
+from carrier_record import record_to_json
+from circuit_breaker import CircuitBreaker
+from rate_limiter import RateController
+from scraper import FMCSAScraper
+
+SUMMARY_OUTCOMES = ('valid', 'invalid', 'not_found', 'unchanged', 'skipped', 'error')
+
+
+def read_mc_numbers(path):
+    """Yield MC numbers from a file (or '-' for stdin): one per line, 'MC' prefixes and '#' comments allowed"""
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        for line in f:
+            line = line.split('#', 1)[0].strip().upper().replace('MC', '').replace('-', '').strip()
+            if line.isdigit():
+                yield int(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class JsonlSink:
+    """Writes records as JSON lines from any worker thread, counting outcomes for the summary"""
+
+    def __init__(self, out, fields=None, status_every=0):
+        self.out = out
+        self.fields = fields
+        self.status_every = status_every
+        self.counts = {outcome: 0 for outcome in SUMMARY_OUTCOMES}
+        self.done = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def progress(self, mc_number, status, data=None):
+        outcome = classify_status(status)
+        if outcome in ('checking', 'retrying'):
+            return
+        with self.lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            self.done += 1
+            if data is not None:
+                self.out.write(record_to_json(data, self.fields) + '\n')
+                # Flush per record so a tail -f or downstream pipe sees results as they arrive
+                self.out.flush()
+            if self.status_every and self.done % self.status_every == 0:
+                print(f'[{self.done} done] {self.summary_line()}', file=sys.stderr, flush=True)
+
+    def removed(self, mc_number):
+        """Output a carrier that had a record last scan and has none now"""
+        with self.lock:
+            self.out.write(json.dumps({'change': 'removed', 'mc_number': mc_number}) + '\n')
+            self.out.flush()
+
+    def summary_line(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        counts = ', '.join(f'{self.counts[outcome]} {outcome}' for outcome in SUMMARY_OUTCOMES if self.counts[outcome]
+                           or outcome in ('valid', 'error'))
+        return f'{self.done} MC in {elapsed:.1f}s ({self.done / elapsed:.1f} MC/s) | {counts}'
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Scrape FMCSA records to JSON lines without the web UI')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--start', type=int, help='First MC number of the range')
+    source.add_argument('--input', help="File of MC numbers, one per line ('-' for stdin)")
+    source.add_argument('--queue', nargs='?', const='',
+                        help='Run as a node claiming work units from a shared queue (see work_queue.py); '
+                             'URL defaults to SCRAPER_WORK_QUEUE')
+    parser.add_argument('--end', type=int, help='Last MC number of the range (default: run until stopped)')
+    parser.add_argument('--entity-type', choices=['Carrier', 'Broker', 'Shipper'], help='Default: Carrier')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SCRAPER_WORKERS', '1')))
+    parser.add_argument('--enrich-workers', type=int, default=int(os.getenv('SCRAPER_ENRICH_WORKERS', '0')),
+                        help='SMS/registration threads; 0 means one per worker')
+    parser.add_argument('--rate', type=float, help='Per-host requests/s to start at and not exceed (default: adaptive 1-5)')
+    parser.add_argument('--max-retries', type=int, default=int(os.getenv('SCRAPER_MAX_RETRIES', '4')),
+                        help='Retries per MC number after a timeout, connection error, 429 or 5xx')
+    parser.add_argument('--output', '-o', help='Write JSON lines here instead of stdout (appended to)')
+    parser.add_argument('--fields', help='Comma-separated record fields to output (default: all)')
+    parser.add_argument('--cache', help='Response cache database, e.g. instance/http_cache.db')
+    parser.add_argument('--census', help='Census database built with census_store.py')
+    parser.add_argument('--census-only', action='store_true', help='Treat MC numbers missing from --census as not found')
+    parser.add_argument('--negative-index', help='Negative index database; numbers known to be dead are skipped')
+    parser.add_argument('--recheck-days', type=float, default=float(os.getenv('SCRAPER_RECHECK_DAYS', '30')))
+    parser.add_argument('--negative-policy', choices=['skip', 'defer'],
+                        default=os.getenv('SCRAPER_NEGATIVE_POLICY', 'skip'),
+                        help="Skip known dead numbers, or defer them to the end of a bounded range")
+    parser.add_argument('--journal', help='Job journal database; an interrupted range run resumes where it stopped')
+    parser.add_argument('--incremental', help='Scan state database; only records changed since the last scan are output')
+    parser.add_argument('--node-id', help='Name of this node in the work queue (default: host-pid)')
+    parser.add_argument('--lease', type=float, default=120.0, help='Work unit lease in seconds, renewed every third')
+    parser.add_argument('--status-every', type=int, default=0, help='Print a progress line every N MC numbers')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show the scraper log on stderr')
+    return parser
+
+
+def run_node(args, make_scraper, sink, interrupted):
+    """Claim work units from the shared queue and scan them until none are left or we're stopped"""
+    from work_queue import NodeProgress, open_work_queue
+
+    queue = open_work_queue(args.queue)
+    node_id = args.node_id or f'{socket.gethostname()}-{os.getpid()}'
+    units = 0
+    while not interrupted.is_set():
+        unit = queue.claim(node_id, args.lease, args.entity_type if args.entity_type_set else None)
+        if unit is None:
+            break
+        print(f'{node_id}: scanning {unit} from MC {unit.resume_mc}', file=sys.stderr, flush=True)
+        progress = NodeProgress(unit)
+        scraper = make_scraper(unit.resume_mc, unit.end_mc, unit.entity_type)
+        lost = threading.Event()
+        done = threading.Event()
+
+        # Report records and renew the lease well before it runs out; stop if another node has it now
+        def heartbeat():
+            while not done.wait(args.lease / 3):
+                records, checkpoint = progress.take()
+                if not queue.report(unit, records) or not queue.renew(unit, args.lease, checkpoint):
+                    print(f'{node_id}: lost the lease on {unit}, stopping it', file=sys.stderr, flush=True)
+                    lost.set()
+                    scraper.stop()
+                    return
+
+        def report(mc_number, status, data=None):
+            sink.progress(mc_number, status, data)
+            if classify_status(status) not in ('checking', 'retrying'):
+                progress.finish(mc_number, data)
+
+        thread = threading.Thread(target=heartbeat, name='lease-heartbeat', daemon=True)
+        thread.start()
+        try:
+            interrupted.scraper = scraper
+            scraper.scrape(report, lambda: None)
+        finally:
+            done.set()
+            thread.join()
+
+        if lost.is_set():
+            continue
+        records, checkpoint = progress.take()
+        if not queue.report(unit, records):
+            continue
+        if interrupted.is_set():
+            queue.release(unit, checkpoint)
+        elif queue.complete(unit):
+            units += 1
+    print(f'{node_id}: finished {units} work units', file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.journal and args.start is None:
+        print('--journal only applies to --start/--end ranges', file=sys.stderr)
+        return 2
+    # In node mode units carry their own entity type; --entity-type only restricts which are claimed
+    args.entity_type_set = args.entity_type is not None
+    args.entity_type = args.entity_type or 'Carrier'
+
+    # Storage backends are imported only when asked for, to keep startup short
+    cache = negative_index = census = tracker = job = journal = None
+    if args.cache:
+        from response_cache import ResponseCache
+        cache = ResponseCache(args.cache)
+    if args.negative_index:
+        from negative_index import NegativeIndex
+        negative_index = NegativeIndex(args.negative_index)
+    if args.census:
+        from census_store import CensusStore
+        census = CensusStore(args.census)
+    if args.incremental:
+        from change_tracker import ChangeTracker
+        tracker = ChangeTracker(args.incremental)
+    if args.journal:
+        from job_journal import JobJournal
+        journal = JobJournal(args.journal)
+        job = journal.find_resumable_job(args.start, args.end, args.entity_type, 'cli')
+        if job and job.resumed:
+            print(f'Resuming previous job after MC {job.checkpoint_mc}', file=sys.stderr)
+        job = job or journal.create_job(args.start, args.end, args.entity_type, args.workers, 'cli')
+
+    # One controller for the whole process, so work units share the per-host rate limits
+    rate_controller = RateController(rate=args.rate, max_rate=args.rate) if args.rate else RateController()
+    circuit_breaker = CircuitBreaker()
+
+    scrapers = []
+
+    def make_scraper(start_mc, end_mc, entity_type, mc_numbers=None):
+        scraper = FMCSAScraper(
+            start_mc, end_mc, entity_type, workers=args.workers, enrich_workers=args.enrich_workers or None,
+            rate_controller=rate_controller, cache=None if tracker else cache, job=job,
+            negative_index=negative_index, recheck_interval=args.recheck_days * 86400,
+            negative_policy=args.negative_policy,
+            census=census, census_only=args.census_only, tracker=tracker, mc_numbers=mc_numbers,
+            circuit_breaker=circuit_breaker, max_retries=args.max_retries
+        )
+        scrapers.append(scraper)
+        return scraper
+
+    out = open(args.output, 'a') if args.output else sys.stdout
+    sink = JsonlSink(out, [field.strip() for field in args.fields.split(',')] if args.fields else None,
+                     args.status_every)
+
+    # First Ctrl-C stops cleanly after the in-flight MC numbers; a second one aborts
+    interrupted = threading.Event()
+    interrupted.scraper = None
+
+    def handle_interrupt(signum, frame):
+        if interrupted.is_set():
+            raise KeyboardInterrupt
+        print('Stopping after in-flight MC numbers (Ctrl-C again to abort)...', file=sys.stderr, flush=True)
+        interrupted.set()
+        if interrupted.scraper is not None:
+            interrupted.scraper.stop()
+    signal.signal(signal.SIGINT, handle_interrupt)
+    signal.signal(signal.SIGTERM, handle_interrupt)
+
+    # The scraper logs with print(); keep that off the JSON lines
+    log = sys.stderr if args.verbose else open(os.devnull, 'w')
+    try:
+        with contextlib.redirect_stdout(log):
+            if args.queue is not None:
+                run_node(args, make_scraper, sink, interrupted)
+            else:
+                scraper = interrupted.scraper = make_scraper(
+                    args.start, args.end, args.entity_type, read_mc_numbers(args.input) if args.input else None
+                )
+                scraper.scrape(sink.progress, lambda: None)
+        if tracker is not None:
+            # Removed carriers have no record to stream as they're found; output them from the change log
+            for run_id in sorted({scraper.run_id for scraper in scrapers}):
+                for change in tracker.iter_changes(run_id):
+                    if change['change'] == 'removed':
+                        sink.removed(change['mc_number'])
+    finally:
+        if args.output:
+            out.close()
+        for store in (negative_index, tracker, journal):
+            if store is not None:
+                store.flush()
+        if job is not None:
+            job.finish('stopped' if interrupted.is_set() else 'completed')
+
+    print(sink.summary_line(), file=sys.stderr)
+    if tracker is not None and scrapers:
+        changes = {change: 0 for change in ('added', 'changed', 'removed')}
+        for run_id in {scraper.run_id for scraper in scrapers}:
+            for change, count in tracker.count_changes(run_id).items():
+                changes[change] += count
+        print(f"Changes: {changes['added']} added, {changes['changed']} changed, {changes['removed']} removed",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
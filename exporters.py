@@ -0,0 +1,24 @@
+"""Writers for exported records, kept free of the Flask app so they can be used and benchmarked on their own."""
+
+# Columns included in exports, in order
+EXPORT_FIELDS = ['mc_number', 'usdot_number', 'legal_name', 'physical_address', 'phone_number', 'email']
+
+XLSX_HEADERS = ['MC Number', 'USDOT Number', 'Legal Name', 'Physical Address', 'Phone Number', 'Email']
+
+
+def write_xlsx(records, path):
+    """Write records to an XLSX file at path using a write-only workbook.
+
+    Rows are appended as they are read instead of being held as cell objects,
+    so memory stays flat however many records are exported.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("FMCSA Data")
+
+    ws.append(XLSX_HEADERS)
+    for record in records:
+        ws.append(record.to_row(EXPORT_FIELDS))
+
+    wb.save(path)
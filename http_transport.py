@@ -0,0 +1,121 @@
+"""Shared HTTP transport for every outbound request the app makes.
+
+One requests.Session per process, with a connection pool mounted per
+known host and sized for the concurrency that host sees: the SAFER
+snapshot and SMS/registration hosts get room for every scraper worker,
+Google Sheets (license table) a couple of connections. Connections are
+kept alive and reused across workers and jobs, so TLS handshakes are paid
+once per pooled connection instead of once per scraper. Pools are sized so
+workers don't overflow them: an overflow connection is opened, used once
+and discarded.
+
+Accept-Encoding lists every encoding urllib3 can decode here (brotli and
+zstd when their packages are installed); decoding is done by urllib3.
+Header sets are built once at import.
+
+stats() reports, per host, connections opened vs requests sent, and the
+resulting reuse rate.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# FMCSA hosts; overridable so scans can run against a local stand-in (see benchmarks/fmcsa_stub.py)
+SAFER_BASE_URL = os.getenv('FMCSA_SAFER_URL', 'https://safer.fmcsa.dot.gov')
+SMS_BASE_URL = os.getenv('FMCSA_SMS_URL', 'http://ai.fmcsa.dot.gov')
+
+# Connections kept per host; FMCSA hosts are shared by every worker of every job
+FMCSA_POOL_SIZE = int(os.getenv('SCRAPER_POOL_SIZE', '64'))
+HOST_POOL_SIZES = {
+    SAFER_BASE_URL: FMCSA_POOL_SIZE,
+    SMS_BASE_URL: FMCSA_POOL_SIZE,
+    # License table export (see license_service.LicenseValidator)
+    'https://docs.google.com': 2,
+}
+DEFAULT_POOL_SIZE = 10
+
+BROWSER_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# Sent with every request
+DEFAULT_HEADERS = {
+    'User-Agent': BROWSER_USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Extra headers for the SAFER snapshot form POST
+SNAPSHOT_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'Origin': 'https://safer.fmcsa.dot.gov',
+    'Referer': 'https://safer.fmcsa.dot.gov/CompanySnapshot.aspx',
+}
+
+# Extra headers for the SMS and registration pages
+SMS_HEADERS = {
+    'Referer': 'https://safer.fmcsa.dot.gov/',
+}
+
+
+class HttpTransport:
+    """A session with per-host connection pools and connection reuse counters"""
+
+    def __init__(self, host_pool_sizes=None, default_pool_size=DEFAULT_POOL_SIZE):
+        self.host_pool_sizes = dict(HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes)
+        self.session = requests.Session()
+        self.session.headers.clear()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        # Unknown hosts share a default-sized adapter; requests picks the longest matching prefix
+        self.adapters = {'*': HTTPAdapter(pool_connections=8, pool_maxsize=default_pool_size)}
+        self.session.mount('https://', self.adapters['*'])
+        self.session.mount('http://', self.adapters['*'])
+        for base_url, size in self.host_pool_sizes.items():
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=size)
+            self.adapters[base_url] = adapter
+            self.session.mount(base_url.rstrip('/') + '/', adapter)
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.session.request('GET', url, **kwargs)
+
+    def stats(self):
+        """Per host: pool size, connections opened, requests sent, idle connections and reuse rate"""
+        stats = {}
+        for adapter in self.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f'{pool.host}:{pool.port}' if pool.port else pool.host
+                requests_sent = pool.num_requests
+                stats[host] = {
+                    'pool_size': pool.pool.maxsize if pool.pool is not None else 0,
+                    'connections_opened': pool.num_connections,
+                    'requests': requests_sent,
+                    'idle': pool.pool.qsize() if pool.pool is not None else 0,
+                    'reuse_rate': round(1 - pool.num_connections / requests_sent, 3) if requests_sent else 0.0,
+                }
+        return stats
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The process-wide transport, created on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
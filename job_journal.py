@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Outcomes that count as finished work; anything else is retried on resume
+# ('skipped' is a known dead number passed over without a fetch)
+COMPLETED_OUTCOMES = ('valid', 'invalid', 'not_found', 'skipped')
+
+
+class JobJournal:
+    """SQLite journal of scan jobs and the MC numbers each one has completed.
+
+    Lets a job interrupted by a restart or redeploy pick up where it left off
+    instead of starting over from start_mc. Records themselves live in the
+    result store; if one is given, it is flushed before every journal commit,
+    so a 'valid' entry is never on disk ahead of its record.
+    """
+
+    def __init__(self, path='instance/jobs.db', commit_every=50, commit_interval=2.0, result_store=None):
+        self.path = path
+        self.result_store = result_store
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending_writes = 0
+        self.last_commit = time.monotonic()
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                start_mc INTEGER NOT NULL,
+                end_mc INTEGER,
+                entity_type TEXT NOT NULL,
+                workers INTEGER NOT NULL DEFAULT 1,
+                owner TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL,
+                checkpoint_mc INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_entries (
+                job_id INTEGER NOT NULL,
+                mc_number INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (job_id, mc_number)
+            )
+        ''')
+        # Journals created before jobs had owners
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(jobs)')]
+        if 'owner' not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self.conn.commit()
+
+    def create_job(self, start_mc, end_mc, entity_type, workers=1, owner=''):
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT INTO jobs (start_mc, end_mc, entity_type, workers, owner, status, checkpoint_mc, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (start_mc, end_mc, entity_type, workers, owner, 'running', start_mc - 1, now, now)
+            )
+            self.conn.commit()
+            return ScanJob(self, cursor.lastrowid, start_mc, end_mc)
+
+    def find_resumable_job(self, start_mc, end_mc, entity_type, owner=''):
+        """Return the owner's most recent unfinished job for the same range and entity type"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT job_id FROM jobs WHERE start_mc = ? AND end_mc IS ? AND entity_type = ? AND owner = ? '
+                "AND status IN ('running', 'stopped') ORDER BY job_id DESC LIMIT 1",
+                (start_mc, end_mc, entity_type, owner)
+            ).fetchone()
+        return self.open_job(row[0]) if row else None
+
+    def latest_job_id(self, owner):
+        """ID of the owner's most recent job, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT job_id FROM jobs WHERE owner = ? ORDER BY job_id DESC LIMIT 1', (owner,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def open_job(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT start_mc, end_mc FROM jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = ScanJob(self, job_id, row[0], row[1])
+        job.load_progress()
+        self.set_status(job_id, 'running')
+        return job
+
+    def set_status(self, job_id, status, checkpoint_mc=None):
+        with self.lock:
+            if checkpoint_mc is None:
+                self.conn.execute(
+                    'UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?',
+                    (status, time.time(), job_id)
+                )
+            else:
+                self.conn.execute(
+                    'UPDATE jobs SET status = ?, checkpoint_mc = ?, updated_at = ? WHERE job_id = ?',
+                    (status, checkpoint_mc, time.time(), job_id)
+                )
+            self._commit(time.monotonic())
+
+    def record(self, job_id, mc_number, outcome):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO job_entries (job_id, mc_number, outcome, recorded_at) VALUES (?, ?, ?, ?)',
+                (job_id, mc_number, outcome, time.time())
+            )
+            self.pending_writes += 1
+
+            # Batch commits; a crash loses at most a few seconds of work, which is redone on resume
+            now = time.monotonic()
+            if self.pending_writes >= self.commit_every or now - self.last_commit >= self.commit_interval:
+                self._commit(now)
+
+    def completed_mc_numbers(self, job_id):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT mc_number FROM job_entries WHERE job_id = ? "
+                f"AND outcome IN ({', '.join('?' for _ in COMPLETED_OUTCOMES)}) ORDER BY mc_number",
+                (job_id,) + COMPLETED_OUTCOMES
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def flush(self):
+        with self.lock:
+            self._commit(time.monotonic())
+
+    def _commit(self, now):
+        # Records first: a committed 'valid' entry means the MC is skipped on resume
+        if self.result_store is not None:
+            self.result_store.flush()
+        self.conn.commit()
+        self.pending_writes = 0
+        self.last_commit = now
+
+
+class ScanJob:
+    """One journaled scan: hands out pending MC numbers and records outcomes"""
+
+    def __init__(self, journal, job_id, start_mc, end_mc):
+        self.journal = journal
+        self.job_id = job_id
+        self.start_mc = start_mc
+        self.end_mc = end_mc
+        self.checkpoint_mc = start_mc - 1
+        self.done_above_checkpoint = set()
+        self.resumed = False
+
+    def load_progress(self):
+        """Rebuild the checkpoint from completed entries.
+
+        The checkpoint is the highest MC number below which every number is done.
+        Concurrent workers can leave gaps; numbers finished past the checkpoint are
+        kept so only the gaps are rescanned.
+        """
+        checkpoint = self.start_mc - 1
+        done_above = set()
+        for mc_number in self.journal.completed_mc_numbers(self.job_id):
+            if mc_number == checkpoint + 1 and not done_above:
+                checkpoint = mc_number
+            elif mc_number > checkpoint:
+                done_above.add(mc_number)
+
+        self.checkpoint_mc = checkpoint
+        self.done_above_checkpoint = done_above
+        self.resumed = checkpoint >= self.start_mc or bool(done_above)
+
+    def iter_pending(self):
+        """Yield MC numbers still to scan, starting after the checkpoint"""
+        mc_number = self.checkpoint_mc + 1
+        while self.end_mc is None or mc_number <= self.end_mc:
+            if mc_number not in self.done_above_checkpoint:
+                yield mc_number
+            mc_number += 1
+
+    def record(self, mc_number, outcome):
+        self.journal.record(self.job_id, mc_number, outcome)
+
+    def finish(self, status):
+        self.journal.flush()
+        self.load_progress()
+        self.journal.set_status(self.job_id, status, self.checkpoint_mc)
@@ -0,0 +1,218 @@
+import threading
+from collections import deque
+
+from progress_stream import ProgressStream
+
+
+class FairRequestLimiter:
+    """Caps in-flight requests across all jobs and splits the cap evenly.
+
+    Each active job may have at most max_inflight // active_jobs requests in
+    flight (at least one), so a job with many workers cannot starve the others.
+    """
+
+    def __init__(self, max_inflight=16):
+        self.max_inflight = max_inflight
+        self.inflight = {}
+        self.cond = threading.Condition()
+
+    def register(self, job_id):
+        with self.cond:
+            self.inflight.setdefault(job_id, 0)
+            self.cond.notify_all()
+
+    def unregister(self, job_id):
+        with self.cond:
+            self.inflight.pop(job_id, None)
+            self.cond.notify_all()
+
+    def share(self):
+        return max(1, self.max_inflight // max(1, len(self.inflight)))
+
+    def acquire(self, job_id, stop_event=None):
+        """Wait for a request slot. Returns False if stop_event fires first."""
+        with self.cond:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                total = sum(self.inflight.values())
+                if total < self.max_inflight and self.inflight.get(job_id, 0) < self.share():
+                    self.inflight[job_id] = self.inflight.get(job_id, 0) + 1
+                    return True
+                # Wake periodically so a stopped job doesn't wait for a release
+                self.cond.wait(0.2)
+
+    def release(self, job_id):
+        with self.cond:
+            if job_id in self.inflight and self.inflight[job_id] > 0:
+                self.inflight[job_id] -= 1
+            self.cond.notify_all()
+
+    def gate(self, job_id):
+        return RequestGate(self, job_id)
+
+    def stats(self):
+        with self.cond:
+            return {
+                'max_inflight': self.max_inflight,
+                'inflight': sum(self.inflight.values()),
+                'share_per_job': self.share()
+            }
+
+
+class RequestGate:
+    """A job's view of the shared limiter, used by FMCSAScraper.request"""
+
+    def __init__(self, limiter, job_id):
+        self.limiter = limiter
+        self.job_id = job_id
+
+    def acquire(self, stop_event=None):
+        return self.limiter.acquire(self.job_id, stop_event)
+
+    def release(self):
+        self.limiter.release(self.job_id)
+
+
+def room_for(job_id):
+    """Socket.IO room that carries a job's events"""
+    return f'job-{job_id}'
+
+
+class ScheduledJob:
+    """A scan job owned by one license, with its own Socket.IO room"""
+
+    def __init__(self, owner, job, scraper, on_finish, initial_count=0):
+        self.owner = owner
+        self.job = job
+        self.job_id = job.job_id
+        self.scraper = scraper
+        self.on_finish = on_finish
+        self.initial_count = initial_count
+        self.room = room_for(job.job_id)
+        self.status = 'queued'
+        self.progress = None
+        self.thread = None
+
+
+class JobScheduler:
+    """Runs scrape jobs for many licenses at once.
+
+    At most max_running_jobs run concurrently and later submissions wait in a
+    FIFO queue. Every job's events go to its own room, and outbound requests
+    from all jobs share one FairRequestLimiter.
+    """
+
+    def __init__(self, emit, max_running_jobs=4, max_inflight_requests=16,
+                 flush_interval=0.5, batch_size=50):
+        self.emit = emit
+        self.max_running_jobs = max_running_jobs
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.limiter = FairRequestLimiter(max_inflight_requests)
+
+        self.jobs = {}  # owner -> ScheduledJob (queued or running)
+        self.queue = deque()
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def submit(self, owner, job, scraper, on_finish, initial_count=0):
+        """Start a job for owner now, or queue it if the scheduler is full.
+
+        on_finish(scheduled_job) runs on the job's thread once scraping ends.
+        """
+        scheduled = ScheduledJob(owner, job, scraper, on_finish, initial_count)
+        scraper.request_gate = self.limiter.gate(job.job_id)
+
+        with self.lock:
+            if owner in self.jobs:
+                raise ValueError('Scraping is already in progress')
+            self.jobs[owner] = scheduled
+            if self.running >= self.max_running_jobs:
+                self.queue.append(scheduled)
+                start_now = False
+            else:
+                self.running += 1
+                start_now = True
+
+        if start_now:
+            self._start(scheduled)
+        else:
+            self.emit('job_queued', {
+                'message': f'Server is busy; your job is queued at position {len(self.queue)}'
+            }, to=scheduled.room)
+        return scheduled
+
+    def get(self, owner):
+        with self.lock:
+            return self.jobs.get(owner)
+
+    def stop(self, owner):
+        """Stop owner's job. Returns False if the owner has no active job."""
+        with self.lock:
+            scheduled = self.jobs.get(owner)
+            if scheduled is None:
+                return False
+            if scheduled.status == 'queued':
+                self.queue.remove(scheduled)
+                del self.jobs[owner]
+                dequeued = True
+            else:
+                dequeued = False
+
+        scheduled.scraper.stop()
+        if dequeued:
+            scheduled.status = 'finished'
+            scheduled.on_finish(scheduled)
+        return True
+
+    def stats(self):
+        with self.lock:
+            stats = {'running': self.running, 'queued': len(self.queue), 'max_running': self.max_running_jobs}
+        stats.update(self.limiter.stats())
+        return stats
+
+    def _start(self, scheduled):
+        scheduled.status = 'running'
+        self.limiter.register(scheduled.job_id)
+
+        room = scheduled.room
+        scraper = scheduled.scraper
+        scheduled.progress = ProgressStream(
+            lambda event, payload: self.emit(event, payload, to=room),
+            flush_interval=self.flush_interval,
+            batch_size=self.batch_size,
+            total_count=scheduled.initial_count,
+            extra=lambda: {'rates': scraper.get_rates()}
+        ).start()
+
+        scheduled.thread = threading.Thread(target=self._run, args=(scheduled,), daemon=True)
+        scheduled.thread.start()
+
+    def _run(self, scheduled):
+        def on_complete():
+            scheduled.progress.close()
+
+        try:
+            scheduled.scraper.scrape(scheduled.progress.on_progress, on_complete)
+        except Exception as e:
+            self.emit('error', {'message': f'Scraping error: {str(e)}'}, to=scheduled.room)
+        finally:
+            self._finish(scheduled)
+
+    def _finish(self, scheduled):
+        self.limiter.unregister(scheduled.job_id)
+        scheduled.status = 'finished'
+        try:
+            scheduled.on_finish(scheduled)
+        finally:
+            with self.lock:
+                if self.jobs.get(scheduled.owner) is scheduled:
+                    del self.jobs[scheduled.owner]
+                next_job = self.queue.popleft() if self.queue else None
+                if next_job is None:
+                    self.running -= 1
+
+            # The finished job's slot passes straight to the next queued job
+            if next_job is not None:
+                self._start(next_job)
@@ -0,0 +1,103 @@
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+
+def expiry_timestamp(expires_at):
+    """Moment a license stops working: the end of its expiry date, matching validate_license"""
+    return (expires_at + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class ExpiryScheduler:
+    """Fires on_expire(license_key, entry) once per license when it expires.
+
+    Upcoming expiry times sit in a min-heap and a single thread sleeps until
+    the earliest one is due, so nothing is polled or re-parsed between
+    expiries. sync() takes the current license table and only touches keys
+    whose expiry changed; superseded heap entries are dropped lazily when
+    they reach the top.
+    """
+
+    # Upper bound on one sleep, so a wall-clock jump is noticed eventually
+    MAX_WAIT = 3600
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self.deadlines = {}  # license_key -> expiry timestamp
+        self.entries = {}    # license_key -> license table entry
+        self.heap = []
+        self.expired = set()
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def sync(self, table):
+        """Bring the schedule in line with a new license table"""
+        with self.cond:
+            changed = False
+            for license_key in list(self.deadlines):
+                if license_key not in table:
+                    # Removed from the sheet; login already refuses it
+                    del self.deadlines[license_key]
+                    self.entries.pop(license_key, None)
+
+            for license_key, entry in table.items():
+                expires_at = entry.get('expires_at')
+                deadline = expiry_timestamp(expires_at) if expires_at else None
+                self.entries[license_key] = entry
+                if self.deadlines.get(license_key) == deadline:
+                    continue
+
+                if deadline is None:
+                    self.deadlines.pop(license_key, None)
+                    self.expired.discard(license_key)
+                    continue
+
+                self.deadlines[license_key] = deadline
+                if deadline > time.time():
+                    # Renewed licenses become usable again
+                    self.expired.discard(license_key)
+                heapq.heappush(self.heap, (deadline, license_key))
+                changed = True
+
+            if changed:
+                self.cond.notify()
+
+    def is_expired(self, license_key):
+        with self.cond:
+            return license_key in self.expired
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self.cond:
+                due = self._pop_due()
+                if not due:
+                    timeout = self.MAX_WAIT
+                    if self.heap:
+                        timeout = min(max(self.heap[0][0] - time.time(), 0), self.MAX_WAIT)
+                    self.cond.wait(timeout)
+                    continue
+
+            for license_key, entry in due:
+                try:
+                    self.on_expire(license_key, entry)
+                except Exception as e:
+                    print(f"Error handling expiry of license {license_key}: {e}")
+
+    def _pop_due(self):
+        """Pop every heap entry that is due and still current. Caller holds the lock."""
+        due = []
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, license_key = heapq.heappop(self.heap)
+            if self.deadlines.get(license_key) != deadline or license_key in self.expired:
+                continue
+            self.expired.add(license_key)
+            due.append((license_key, self.entries.get(license_key, {})))
+        return due
@@ -1,98 +1,233 @@
-import requests
+from http_transport import get_transport
 from datetime import datetime
 import csv
 import io
+import os
+import threading
+import time
+
+EXPIRY_DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
+
+def parse_expiry_date(expiry_date_str):
+    """Parse a sheet expiry date, trying each supported format. Returns None if none match."""
+    for date_format in EXPIRY_DATE_FORMATS:
+        try:
+            return datetime.strptime(expiry_date_str, date_format)
+        except ValueError:
+            continue
+    return None
 
 class LicenseValidator:
-    def __init__(self):
+    def __init__(self, refresh_interval=60, max_staleness=300, snapshot_path='instance/licenses.csv'):
         self.sheet_url = "https://docs.google.com/spreadsheets/d/1-zNSIDD5iftss3SAurzmQKHgSc2ZYPC7BEyw2ZcQWrc/edit?usp=sharing"
         self.sheet_id = "1-zNSIDD5iftss3SAurzmQKHgSc2ZYPC7BEyw2ZcQWrc"
-        
+        self.csv_url = f"https://docs.google.com/spreadsheets/d/{self.sheet_id}/export?format=csv&gid=0"
+
+        # Local license table indexed by license key, refreshed in the background.
+        # Logins are answered from it as long as it is younger than max_staleness
+        # seconds; if the sheet is unreachable the last good copy keeps being used.
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.snapshot_path = snapshot_path
+        self.table = {}
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.etag = None
+        self.last_modified = None
+        self.last_failure = 0.0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.refresh_thread = None
+        self.listeners = []
+
+        self._load_snapshot()
+
+    def _build_table(self, csv_text):
+        table = {}
+        for row in csv.DictReader(io.StringIO(csv_text)):
+            license_key = row.get('License Key', '').strip()
+            # The first row for a key wins, as with the old linear scan
+            if not license_key or license_key in table:
+                continue
+            expiry_date_str = row.get('Expiry Date', '').strip()
+            table[license_key] = {
+                'license_key': license_key,
+                'name': row.get('Name', ''),
+                'email': row.get('Primary Email', '').strip(),
+                'expiry_date': expiry_date_str,
+                'expires_at': parse_expiry_date(expiry_date_str) if expiry_date_str else None
+            }
+        return table
+
+    def _load_snapshot(self):
+        """Seed the table from the last good copy on disk, so a cold start works without the sheet"""
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                table = self._build_table(f.read())
+        except OSError:
+            return
+        with self.lock:
+            self.table = table
+            self.loaded = True
+            # Treat it as stale so the first login tries the sheet
+            self.loaded_at = 0.0
+
+    def add_listener(self, callback):
+        """Call callback(table) now and whenever a refresh replaces the license table"""
+        self.listeners.append(callback)
+        with self.lock:
+            table, loaded = self.table, self.loaded
+        if loaded:
+            callback(table)
+
+    def _notify_listeners(self, table):
+        for callback in self.listeners:
+            try:
+                callback(table)
+            except Exception as e:
+                print(f"Error in license table listener: {str(e)}")
+
+    def _save_snapshot(self, csv_text):
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(csv_text)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Could not save license snapshot: {str(e)}")
+
+    def refresh(self):
+        """
+        Refresh the license table from Google Sheets with a conditional request
+        Returns: True if the table is current, False if the sheet could not be reached
+        """
+        with self.refresh_lock:
+            headers = {}
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+            try:
+                response = get_transport().get(self.csv_url, headers=headers, timeout=10)
+                if response.status_code == 304:
+                    with self.lock:
+                        self.loaded_at = time.time()
+                    return True
+                response.raise_for_status()
+                table = self._build_table(response.text)
+            except Exception as e:
+                print(f"Error refreshing license table: {str(e)}")
+                self.last_failure = time.time()
+                return False
+
+            with self.lock:
+                self.table = table
+                self.loaded = True
+                self.loaded_at = time.time()
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+
+            self._save_snapshot(response.text)
+            self._notify_listeners(table)
+            return True
+
+    def start_background_refresh(self):
+        """Keep the license table fresh from a daemon thread"""
+        if self.refresh_thread is not None:
+            return
+
+        def run():
+            while True:
+                self.refresh()
+                time.sleep(self.refresh_interval)
+
+        self.refresh_thread = threading.Thread(target=run, daemon=True)
+        self.refresh_thread.start()
+
+    def _ensure_table(self):
+        """Make sure the table is within the staleness bound. Returns False if no copy is available."""
+        now = time.time()
+        with self.lock:
+            fresh = self.loaded and now - self.loaded_at <= self.max_staleness
+        if fresh:
+            return True
+
+        # While the sheet is down, don't make every login wait on another failed fetch
+        if self.loaded and now - self.last_failure < self.refresh_interval:
+            return True
+
+        if not self.refresh():
+            with self.lock:
+                if self.loaded:
+                    print("License sheet unreachable - using last good copy of the license table")
+                return self.loaded
+        return True
+
+    def lookup(self, license_key):
+        with self.lock:
+            return self.table.get(license_key.strip())
+
     def validate_license(self, license_key, user_email):
         """
-        Validate license key against Google Sheets using CSV export
+        Validate license key against the local license table
         Returns: dict with 'valid', 'expired', 'message' keys
         """
         try:
-            # Create CSV export URL for the Google Sheet
-            csv_url = f"https://docs.google.com/spreadsheets/d/{self.sheet_id}/export?format=csv&gid=0"
-            
-            # Fetch the CSV data
-            response = requests.get(csv_url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse CSV data
-            csv_data = csv.DictReader(io.StringIO(response.text))
-            
-            # Find matching license key
-            for row in csv_data:
-                stored_license_key = row.get('License Key', '').strip()
-                if stored_license_key == license_key.strip():
-                    # Check if email matches
-                    sheet_email = row.get('Primary Email', '').strip().lower()
-                    if sheet_email != user_email.lower():
-                        return {
-                            'valid': False,
-                            'expired': False,
-                            'message': 'License key is not associated with your email address.'
-                        }
-                    
-                    # Check expiry date
-                    expiry_date_str = row.get('Expiry Date', '').strip()
-                    if expiry_date_str:
-                        try:
-                            # Try different date formats
-                            expiry_date = None
-                            for date_format in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']:
-                                try:
-                                    expiry_date = datetime.strptime(expiry_date_str, date_format)
-                                    break
-                                except ValueError:
-                                    continue
-                            
-                            if expiry_date is None:
-                                return {
-                                    'valid': False,
-                                    'expired': False,
-                                    'message': 'Invalid expiry date format in database.'
-                                }
-                            
-                            if expiry_date.date() < datetime.now().date():
-                                return {
-                                    'valid': False,
-                                    'expired': True,
-                                    'message': f'License key expired on {expiry_date.strftime("%Y-%m-%d")}.'
-                                }
-                        except Exception as e:
-                            return {
-                                'valid': False,
-                                'expired': False,
-                                'message': 'Error processing expiry date.'
-                            }
-                    
-                    # All checks passed
+            if not self._ensure_table():
+                return {
+                    'valid': False,
+                    'expired': False,
+                    'message': 'Unable to connect to license database. Please check your internet connection and try again.'
+                }
+
+            entry = self.lookup(license_key)
+            if entry is None:
+                # License key not found
+                return {
+                    'valid': False,
+                    'expired': False,
+                    'message': 'License key not found in database.'
+                }
+
+            # Check if email matches
+            if entry['email'].lower() != user_email.lower():
+                return {
+                    'valid': False,
+                    'expired': False,
+                    'message': 'License key is not associated with your email address.'
+                }
+
+            # Check expiry date
+            expiry_date_str = entry['expiry_date']
+            if expiry_date_str:
+                expiry_date = entry['expires_at']
+                if expiry_date is None:
                     return {
-                        'valid': True,
+                        'valid': False,
                         'expired': False,
-                        'message': 'License key is valid and active.',
-                        'name': row.get('Name', ''),
-                        'expiry_date': expiry_date_str
+                        'message': 'Invalid expiry date format in database.'
                     }
-            
-            # License key not found
-            return {
-                'valid': False,
-                'expired': False,
-                'message': 'License key not found in database.'
-            }
-            
-        except requests.RequestException as e:
-            print(f"Network error validating license: {str(e)}")
+
+                if expiry_date.date() < datetime.now().date():
+                    return {
+                        'valid': False,
+                        'expired': True,
+                        'message': f'License key expired on {expiry_date.strftime("%Y-%m-%d")}.'
+                    }
+
+            # All checks passed
             return {
-                'valid': False,
+                'valid': True,
                 'expired': False,
-                'message': 'Unable to connect to license database. Please check your internet connection and try again.'
+                'message': 'License key is valid and active.',
+                'name': entry['name'],
+                'expiry_date': expiry_date_str
             }
+
         except Exception as e:
             print(f"Error validating license: {str(e)}")
             return {
@@ -100,39 +235,29 @@ class LicenseValidator:
                 'expired': False,
                 'message': 'Unable to validate license at this time. Please try again later.'
             }
-    
+
     def get_all_licenses(self):
         """
-        Retrieve all licenses from Google Sheets for expiry monitoring
+        Retrieve all licenses from the local license table for expiry monitoring
         Returns: list of dicts with license data
         """
-        try:
-            # Create CSV export URL for the Google Sheet
-            csv_url = f"https://docs.google.com/spreadsheets/d/{self.sheet_id}/export?format=csv&gid=0"
-            
-            # Fetch the CSV data
-            response = requests.get(csv_url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse CSV data
-            csv_data = csv.DictReader(io.StringIO(response.text))
-            
-            licenses = []
-            for row in csv_data:
-                license_key = row.get('License Key', '').strip()
-                if license_key:  # Only include rows with license keys
-                    licenses.append({
-                        'license_key': license_key,
-                        'name': row.get('Name', '').strip(),
-                        'email': row.get('Primary Email', '').strip(),
-                        'expiry_date': row.get('Expiry Date', '').strip()
-                    })
-            
-            return licenses
-            
-        except Exception as e:
-            print(f"Error fetching all licenses: {str(e)}")
+        if not self._ensure_table():
             return []
 
+        with self.lock:
+            return [
+                {
+                    'license_key': entry['license_key'],
+                    'name': entry['name'].strip(),
+                    'email': entry['email'],
+                    'expiry_date': entry['expiry_date']
+                }
+                for entry in self.table.values()
+            ]
+
 # Create global instance
-license_validator = LicenseValidator()
\ No newline at end of file
+license_validator = LicenseValidator(
+    refresh_interval=float(os.getenv('LICENSE_REFRESH_INTERVAL', '60')),
+    max_staleness=float(os.getenv('LICENSE_MAX_STALENESS', '300')),
+    snapshot_path=os.getenv('LICENSE_SNAPSHOT_PATH', 'instance/licenses.csv')
+)
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+# Outcome codes stored per MC number; 0 means no negative result on record
+OUTCOME_CODES = {
+    'not_found': 1,
+    'inactive': 2,
+    'bad_query': 3,
+    'mismatch': 4,
+    'no_name': 5,
+}
+OUTCOME_NAMES = {code: name for name, code in OUTCOME_CODES.items()}
+
+# MC numbers per chunk. Chunks are only allocated once they hold an entry,
+# so sparse parts of the MC space cost nothing.
+CHUNK_SIZE = 4096
+
+
+class NegativeIndex:
+    """Compact persistent index of MC numbers that returned no usable record.
+
+    The MC number space is split into fixed-size chunks (roaring-bitmap style).
+    Each allocated chunk keeps one outcome byte and one uint32 check time per
+    MC number, about 20 KB per 4096 numbers, and is stored as two blobs in
+    SQLite. Dirty chunks are written back on flush().
+    """
+
+    def __init__(self, path='instance/negative_index.db', flush_every=500):
+        self.path = path
+        self.flush_every = flush_every
+        self.chunks = {}
+        self.dirty = set()
+        self.pending = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS negative_chunks (
+                chunk_id INTEGER PRIMARY KEY,
+                outcomes BLOB NOT NULL,
+                checked_at BLOB NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+        for chunk_id, outcomes, checked_blob in self.conn.execute(
+                'SELECT chunk_id, outcomes, checked_at FROM negative_chunks'):
+            checked_at = array('I')
+            checked_at.frombytes(checked_blob)
+            self.chunks[chunk_id] = (bytearray(outcomes), checked_at)
+
+    def _chunk(self, mc_number, create):
+        chunk_id = mc_number // CHUNK_SIZE
+        chunk = self.chunks.get(chunk_id)
+        if chunk is None and create:
+            chunk = (bytearray(CHUNK_SIZE), array('I', bytes(4 * CHUNK_SIZE)))
+            self.chunks[chunk_id] = chunk
+        return chunk_id, chunk
+
+    def record(self, mc_number, outcome):
+        """Record a negative outcome for an MC number, or clear it with outcome=None"""
+        code = OUTCOME_CODES[outcome] if outcome else 0
+        with self.lock:
+            chunk_id, chunk = self._chunk(mc_number, create=bool(code))
+            if chunk is None:
+                return
+            offset = mc_number % CHUNK_SIZE
+            chunk[0][offset] = code
+            chunk[1][offset] = int(time.time()) if code else 0
+            self.dirty.add(chunk_id)
+            self.pending += 1
+            should_flush = self.pending >= self.flush_every
+
+        if should_flush:
+            self.flush()
+
+    def lookup(self, mc_number):
+        """Return (outcome, checked_at) for an MC number, or None if nothing is recorded"""
+        with self.lock:
+            _, chunk = self._chunk(mc_number, create=False)
+            if chunk is None:
+                return None
+            offset = mc_number % CHUNK_SIZE
+            code = chunk[0][offset]
+            if not code:
+                return None
+            return OUTCOME_NAMES[code], chunk[1][offset]
+
+    def is_dead(self, mc_number, recheck_interval):
+        """True if the MC number had a negative result less than recheck_interval seconds ago"""
+        entry = self.lookup(mc_number)
+        return entry is not None and time.time() - entry[1] < recheck_interval
+
+    def flush(self):
+        with self.lock:
+            rows = [
+                (chunk_id, bytes(self.chunks[chunk_id][0]), self.chunks[chunk_id][1].tobytes())
+                for chunk_id in self.dirty
+            ]
+            self.dirty.clear()
+            self.pending = 0
+            if rows:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO negative_chunks (chunk_id, outcomes, checked_at) VALUES (?, ?, ?)',
+                    rows
+                )
+                self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            counts = {name: 0 for name in OUTCOME_CODES}
+            for outcomes, _ in self.chunks.values():
+                for code, name in OUTCOME_NAMES.items():
+                    counts[name] += outcomes.count(code)
+            counts['chunks'] = len(self.chunks)
+            return counts
@@ -0,0 +1,247 @@
+"""Pluggable HTML parser backends for the FMCSA extraction path.
+
+Every backend is wrapped in a small document interface (rows, next cell,
+text, links) that mirrors the BeautifulSoup calls the scraper relies on, so
+extraction code is written once and produces the same output whichever
+backend parsed the page.
+
+Backends, fastest first:
+    selectolax  - Lexbor C parser and selector engine (pip install selectolax)
+    lxml        - BeautifulSoup on the libxml2 tree builder (pip install lxml)
+    html.parser - BeautifulSoup on the pure-Python standard library parser
+
+Run ``python parsers.py`` to check that every installed backend extracts the
+same data from the saved pages in fixtures/safer.
+"""
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Text inside these tags is not page text (BeautifulSoup's get_text skips it too)
+NON_TEXT_TAGS = ['script', 'style', 'template']
+
+
+def available_backends():
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if HAS_LXML:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def default_backend():
+    """Backend from SCRAPER_HTML_PARSER, otherwise the fastest one installed"""
+    available = available_backends()
+    requested = os.getenv('SCRAPER_HTML_PARSER', '')
+    if requested in available:
+        return requested
+    return available[0]
+
+
+def parse(content, backend=None, only=None):
+    """Parse an HTML page into a document.
+
+    only: optional tuple of tag names. When given, just those elements (and
+    their contents) are kept, like a BeautifulSoup SoupStrainer, which skips
+    building the rest of the tree.
+    """
+    backend = backend or default_backend()
+    if backend == 'selectolax':
+        if LexborHTMLParser is None:
+            raise ValueError('selectolax is not installed')
+        return SelectolaxDocument(content, only)
+    if backend in ('lxml', 'html.parser'):
+        if backend == 'lxml' and not HAS_LXML:
+            raise ValueError('lxml is not installed')
+        return SoupDocument(content, backend, only)
+    raise ValueError(f'Unknown parser backend: {backend}')
+
+
+class SoupDocument:
+    """Document backed by a BeautifulSoup tree"""
+
+    def __init__(self, content, builder, only=None):
+        parse_only = SoupStrainer(list(only)) if only else None
+        self.soup = BeautifulSoup(content, builder, parse_only=parse_only)
+
+    def get_text(self):
+        return self.soup.get_text()
+
+    def rows(self):
+        """Yield (header cells, has data cells) for every table row"""
+        for row in self.soup.find_all('tr'):
+            yield row.find_all('th'), row.find('td') is not None
+
+    def find_next_td(self, node):
+        return node.find_next('td')
+
+    def node_text(self, node):
+        return node.get_text(strip=True)
+
+    def stripped_strings(self, node):
+        return node.stripped_strings
+
+    def find_links(self, href_pattern):
+        """hrefs of links whose href matches the compiled pattern, in page order"""
+        return [link.get('href', '') for link in self.soup.find_all('a', href=href_pattern)]
+
+    def find_links_by_text(self, text_pattern):
+        """hrefs of links whose single text string matches the compiled pattern"""
+        return [link.get('href', '') for link in self.soup.find_all('a', string=text_pattern)]
+
+
+class SelectolaxDocument:
+    """Document backed by a Lexbor tree, matching SoupDocument's results"""
+
+    def __init__(self, content, only=None):
+        self.tree = LexborHTMLParser(content)
+        self.tree.strip_tags(NON_TEXT_TAGS)
+        if only:
+            self.roots = self._top_level(self.tree.css(', '.join(only)))
+        else:
+            self.roots = [self.tree.root] if self.tree.root is not None else []
+
+    @staticmethod
+    def _top_level(nodes):
+        # Nested matches are already covered by their outermost ancestor
+        seen = set()
+        roots = []
+        for node in nodes:
+            parent = node.parent
+            nested = False
+            while parent is not None:
+                if parent.mem_id in seen:
+                    nested = True
+                    break
+                parent = parent.parent
+            if not nested:
+                roots.append(node)
+            seen.add(node.mem_id)
+        return roots
+
+    def _select(self, tag):
+        # Lexbor's css() includes the node itself when it matches
+        for root in self.roots:
+            yield from root.css(tag)
+
+    def get_text(self):
+        return ''.join(root.text(deep=True, separator='', strip=False) for root in self.roots)
+
+    def rows(self):
+        for row in self._select('tr'):
+            yield row.css('th'), row.css_first('td') is not None
+
+    def find_next_td(self, node):
+        # Document-order walk, like BeautifulSoup's find_next
+        current = node
+        while current is not None:
+            if current.child is not None:
+                current = current.child
+            else:
+                while current is not None and current.next is None:
+                    current = current.parent
+                if current is None:
+                    return None
+                current = current.next
+            if current.tag == 'td':
+                return current
+        return None
+
+    def node_text(self, node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def stripped_strings(self, node):
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text':
+                text = child.text_content.strip()
+                if text:
+                    yield text
+
+    def find_links(self, href_pattern):
+        hrefs = []
+        for link in self._select('a'):
+            href = link.attributes.get('href')
+            if href is not None and href_pattern.search(href):
+                hrefs.append(href)
+        return hrefs
+
+    def find_links_by_text(self, text_pattern):
+        hrefs = []
+        for link in self._select('a'):
+            text = self._single_string(link)
+            if text is not None and text_pattern.search(text):
+                hrefs.append(link.attributes.get('href') or '')
+        return hrefs
+
+    @staticmethod
+    def _single_string(node):
+        # Same rule as BeautifulSoup's Tag.string: follow lone children down to a text node
+        while True:
+            child = node.child
+            if child is None or child.next is not None:
+                return None
+            if child.tag == '-text':
+                return child.text_content
+            node = child
+
+
+def check_fixtures(fixture_dir=None):
+    """Compare extraction output from every installed backend on the saved fixture pages"""
+    import glob
+    from scraper import FMCSAScraper
+
+    fixture_dir = fixture_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'safer')
+    backends = available_backends()
+    failures = 0
+
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        outputs = {}
+        for backend in backends:
+            scraper = FMCSAScraper(123456, parser_backend=backend)
+            doc = parse(content, backend)
+            registration = {}
+            scraper.extract_registration_data(doc, registration)
+            outputs[backend] = {
+                'snapshot': scraper.parse_snapshot(content, 123456),
+                'main': scraper.extract_main_data(doc, 123456),
+                'registration': registration,
+                'mc_match': scraper.validate_mc_match(doc, 123456),
+                'registration_links': scraper.find_registration_links(parse(content, backend, only=('a',))),
+            }
+
+        reference = outputs[backends[0]]
+        mismatched = [backend for backend in backends[1:] if outputs[backend] != reference]
+        name = os.path.basename(path)
+        if mismatched:
+            failures += 1
+            print(f'MISMATCH {name}: {", ".join(mismatched)} differ from {backends[0]}')
+            for backend in mismatched:
+                for key in reference:
+                    if outputs[backend][key] != reference[key]:
+                        print(f'  {key}: {backends[0]}={reference[key]!r}')
+                        print(f'  {key}: {backend}={outputs[backend][key]!r}')
+        else:
+            print(f'ok       {name} ({", ".join(backends)})')
+
+    return failures == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check_fixtures() else 1)
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from carrier_record import CarrierRecord
+
+
+def classify_status(status):
+    """Map a scraper progress status string to an outcome bucket"""
+    if status == 'valid':
+        return 'valid'
+    if status.startswith('Checking'):
+        return 'checking'
+    if status.startswith('Retrying'):
+        return 'retrying'
+    if status.startswith('Invalid'):
+        return 'invalid'
+    if status == 'Not found':
+        return 'not_found'
+    if status == 'Unchanged':
+        return 'unchanged'
+    if status.startswith('Skipped'):
+        return 'skipped'
+    return 'error'
+
+
+def as_payload(record):
+    """A record as a plain dict for a Socket.IO frame"""
+    return record.to_dict() if isinstance(record, CarrierRecord) else record
+
+
+class ProgressStream:
+    """Coalesces scraper progress into periodic snapshots and batched records.
+
+    The scraper's progress_callback can fire several times per MC number from
+    many workers. Instead of emitting each call, this keeps running counts and
+    every flush_interval seconds emits one 'progress_update' snapshot (current
+    MC, counts by outcome, MC/sec) plus the new records in 'data_update'
+    frames of up to batch_size records. A full batch is sent immediately.
+    """
+
+    OUTCOMES = ('valid', 'invalid', 'not_found', 'unchanged', 'skipped', 'error')
+
+    def __init__(self, emit, flush_interval=0.5, batch_size=50, total_count=0, extra=None):
+        self.emit = emit
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.total_count = total_count
+        self.extra = extra
+
+        self.current_mc = None
+        self.last_status = ''
+        self.counts = {outcome: 0 for outcome in self.OUTCOMES}
+        self.pending_records = []
+        self.started_at = time.monotonic()
+        self.changed = False
+
+        self.lock = threading.Lock()
+        self.emit_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def on_progress(self, current_mc, status, data=None):
+        """Drop-in progress_callback for FMCSAScraper.scrape"""
+        outcome = classify_status(status)
+        batch = None
+        with self.lock:
+            self.current_mc = current_mc
+            self.last_status = status
+            self.changed = True
+            if outcome in self.counts:
+                self.counts[outcome] += 1
+            if outcome == 'valid' and data:
+                self.total_count += 1
+                self.pending_records.append(data)
+                if len(self.pending_records) >= self.batch_size:
+                    batch, self.pending_records = self.pending_records, []
+                    total = self.total_count
+
+        if batch:
+            self._emit_records(batch, total)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            checked = sum(self.counts.values())
+            payload = {
+                'current_mc': self.current_mc,
+                'status': self.last_status,
+                'counts': dict(self.counts),
+                'rate': round(checked / elapsed, 2),
+                'total_count': self.total_count,
+            }
+        if self.extra:
+            payload.update(self.extra())
+        return payload
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending_records = self.pending_records, []
+            changed, self.changed = self.changed, False
+            total = self.total_count
+
+        if batch:
+            self._emit_records(batch, total)
+        if changed:
+            with self.emit_lock:
+                self.emit('progress_update', self.snapshot())
+
+    def close(self):
+        """Stop the flush thread and send whatever is still pending"""
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.flush()
+
+    def _emit_records(self, batch, total):
+        for start in range(0, len(batch), self.batch_size):
+            with self.emit_lock:
+                self.emit('data_update', {
+                    'records': [as_payload(record) for record in batch[start:start + self.batch_size]],
+                    'total_count': total
+                })
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,143 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Token bucket whose refill rate is tuned with AIMD.
+
+    The rate (requests per second) grows by a fixed step after every healthy
+    response and is cut by a multiplicative factor when the host signals that
+    it is overloaded (HTTP 429, 5xx or a timeout).
+    """
+
+    def __init__(self, rate=1.0, min_rate=0.2, max_rate=5.0, burst=2,
+                 increase_step=0.05, decrease_factor=0.5, backoff_cooldown=1.0):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.backoff_cooldown = float(backoff_cooldown)
+
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.last_backoff = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def acquire(self, stop_event=None):
+        """Block until a token is available. Returns False if stop_event fires first."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                # updated_at is in the future while a Retry-After is being honoured
+                wait_time = max(self.updated_at - now, 0) + (1 - self.tokens) / self.rate
+
+            if stop_event is not None:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            now = time.monotonic()
+
+            # Concurrent workers tend to hit the same overload at once; only
+            # count it as one congestion signal per cooldown window
+            if now - self.last_backoff < self.backoff_cooldown:
+                return
+
+            self.last_backoff = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.tokens = 0.0
+            self.updated_at = now
+
+            if retry_after:
+                # Push the next refill out so nothing is sent before Retry-After
+                self.updated_at = now + retry_after
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'rate': round(self.rate, 3),
+                'successes': self.successes,
+                'failures': self.failures
+            }
+
+
+class RateController:
+    """Keeps one adaptive token bucket per host"""
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, host_settings=None, **default_settings):
+        self.host_settings = host_settings or {}
+        self.default_settings = default_settings
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                settings = dict(self.default_settings)
+                settings.update(self.host_settings.get(host, {}))
+                bucket = TokenBucket(**settings)
+                self.buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url, stop_event=None):
+        return self.bucket_for(url).acquire(stop_event)
+
+    def record_response(self, url, response):
+        """Feed a response into the host's bucket. Returns its Retry-After in seconds, or None."""
+        bucket = self.bucket_for(url)
+        if response.status_code in self.RETRYABLE_STATUS:
+            retry_after = self._retry_after(response)
+            bucket.on_failure(retry_after)
+            return retry_after
+        bucket.on_success()
+        return None
+
+    def record_error(self, url):
+        self.bucket_for(url).on_failure()
+
+    def get_rates(self):
+        """Current request rate per host, in requests per second"""
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {host: bucket.snapshot()['rate'] for host, bucket in buckets.items()}
+
+    def get_stats(self):
+        """Per host: current rate and the successes and failures the bucket has seen"""
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {host: bucket.snapshot() for host, bucket in buckets.items()}
+
+    def _retry_after(self, response):
+        value = response.headers.get('Retry-After', '')
+        try:
+            return min(float(value), 60.0)
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,86 @@
+import re
+import threading
+
+# Known layouts of the SMS registration page URL; {base} is the SMS host
+DEFAULT_PATTERNS = ('{base}/SMS/Carrier/{dot}/CarrierRegistration.aspx',)
+
+# Consecutive misses after which a pattern is only re-probed occasionally
+MAX_CONSECUTIVE_MISSES = 5
+PROBE_EVERY = 50
+
+
+class RegistrationResolver:
+    """Builds SMS registration page URLs straight from a USDOT number.
+
+    That skips fetching the SMS carrier page just to find its "Carrier
+    Registration Details" link. Patterns are tried best-first by hit count.
+    A pattern that keeps missing is benched and only re-probed every
+    PROBE_EVERY lookups, so a site change costs one wasted request for a
+    while rather than one per record. URLs found by the SMS link crawl are
+    turned into patterns with learn(), so a new layout is picked up
+    automatically. One resolver is meant to be shared by all scrapers.
+    """
+
+    def __init__(self, base_url, patterns=DEFAULT_PATTERNS):
+        self.base_url = base_url.rstrip('/')
+        self.patterns = {}
+        self.lookups = 0
+        self.stats_counts = {'direct_hits': 0, 'direct_misses': 0, 'sms_fallbacks': 0, 'learned': 0}
+        self.lock = threading.Lock()
+        for pattern in patterns:
+            self._add(pattern)
+
+    def _add(self, pattern):
+        self.patterns[pattern] = {'hits': 0, 'misses': 0, 'consecutive_misses': 0}
+
+    def candidates(self, usdot_number):
+        """(pattern, url) pairs worth trying for a USDOT number, best first"""
+        with self.lock:
+            self.lookups += 1
+            probe = self.lookups % PROBE_EVERY == 0
+            ranked = sorted(self.patterns.items(), key=lambda item: -item[1]['hits'])
+            usable = [
+                pattern for pattern, stats in ranked
+                if stats['consecutive_misses'] < MAX_CONSECUTIVE_MISSES or probe
+            ]
+        return [(pattern, pattern.format(base=self.base_url, dot=usdot_number)) for pattern in usable]
+
+    def accepts(self, response, usdot_number):
+        """True if a response is the registration page for this carrier"""
+        if response.status_code != 200:
+            return False
+        content = response.content
+        return b'Registration' in content and str(usdot_number).encode() in content
+
+    def record(self, pattern, hit):
+        with self.lock:
+            stats = self.patterns.get(pattern)
+            if stats is None:
+                return
+            if hit:
+                stats['hits'] += 1
+                stats['consecutive_misses'] = 0
+                self.stats_counts['direct_hits'] += 1
+            else:
+                stats['misses'] += 1
+                stats['consecutive_misses'] += 1
+                self.stats_counts['direct_misses'] += 1
+
+    def learn(self, reg_url, usdot_number):
+        """Remember the layout of a registration URL found by the SMS crawl"""
+        with self.lock:
+            self.stats_counts['sms_fallbacks'] += 1
+            usdot_number = str(usdot_number)
+            if not reg_url.startswith(self.base_url) or usdot_number not in reg_url:
+                return
+            path = reg_url[len(self.base_url):].replace('{', '{{').replace('}', '}}')
+            pattern = '{base}' + re.sub(r'(?<!\d)' + re.escape(usdot_number) + r'(?!\d)', '{dot}', path)
+            if '{dot}' in pattern and pattern not in self.patterns:
+                self._add(pattern)
+                self.stats_counts['learned'] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.stats_counts)
+            stats['patterns'] = {pattern: dict(counts) for pattern, counts in self.patterns.items()}
+        return stats
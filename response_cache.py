@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+# Default time-to-live per page type, in seconds
+DEFAULT_TTLS = {
+    'snapshot': 24 * 60 * 60,
+    'sms': 7 * 24 * 60 * 60,
+    'registration': 7 * 24 * 60 * 60,
+}
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response rebuilt from a cache entry"""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error for url: {self.url}')
+
+
+class ResponseCache:
+    """On-disk SQLite cache for FMCSA pages, keyed by page type and MC number/URL"""
+
+    def __init__(self, path='instance/http_cache.db', ttls=None):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                page_type TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (page_type, cache_key)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_fetched_at ON responses (fetched_at)')
+        self.conn.commit()
+
+    def get(self, page_type, cache_key):
+        """Return a CachedResponse if a fresh entry exists, otherwise None"""
+        ttl = self.ttls.get(page_type, 0)
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT url, status_code, content, fetched_at FROM responses WHERE page_type = ? AND cache_key = ?',
+                (page_type, str(cache_key))
+            ).fetchone()
+
+            if row is None or time.time() - row[3] > ttl:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return CachedResponse(row[0], row[1], bytes(row[2]))
+
+    def put(self, page_type, cache_key, response):
+        """Store a successful response"""
+        if response.status_code != 200:
+            return
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (page_type, cache_key, url, status_code, content, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (page_type, str(cache_key), response.url or '', response.status_code,
+                 sqlite3.Binary(response.content), time.time())
+            )
+            self.conn.commit()
+
+    def purge(self, max_age):
+        """Delete entries older than max_age seconds. Returns the number removed."""
+        cutoff = time.time() - max_age
+        with self.lock:
+            cursor = self.conn.execute('DELETE FROM responses WHERE fetched_at < ?', (cutoff,))
+            self.conn.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'entries': entries
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
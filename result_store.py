@@ -0,0 +1,120 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from carrier_record import RECORD_FIELDS, CarrierRecord
+
+STATE_PATTERN = re.compile(r',\s*([A-Z]{2})\s+\d{5}(?:-\d{4})?\s*$')
+
+
+def extract_state(address):
+    """Pull the two-letter state code out of a SAFER physical address"""
+    match = STATE_PATTERN.search(address or '')
+    return match.group(1) if match else ''
+
+
+class ResultStore:
+    """Persistent, indexed store of scraped records grouped by job.
+
+    Records are written as they are scraped and read back in batches, so
+    memory use stays flat regardless of how many records a job produces.
+    """
+
+    def __init__(self, path='instance/results.db', commit_every=100, commit_interval=2.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending_writes = 0
+        self.last_commit = time.monotonic()
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        columns = ', '.join(f"{field} TEXT NOT NULL DEFAULT ''" for field in RECORD_FIELDS)
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS records (
+                job_id INTEGER NOT NULL,
+                mc_int INTEGER NOT NULL,
+                {columns},
+                state TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, mc_int)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_records_mc ON records (mc_number)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_records_usdot ON records (usdot_number)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_records_state ON records (state)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_records_entity ON records (entity_type)')
+        self.conn.commit()
+
+    def add(self, job_id, record):
+        """Insert or replace a record for a job"""
+        if isinstance(record, CarrierRecord):
+            values = record.to_row()
+        else:
+            values = [str(record.get(field) or '') for field in RECORD_FIELDS]
+        placeholders = ', '.join('?' for _ in range(len(RECORD_FIELDS) + 4))
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO records (job_id, mc_int, {', '.join(RECORD_FIELDS)}, state, created_at) "
+                f'VALUES ({placeholders})',
+                [job_id, int(record['mc_number'])] + values + [extract_state(record.get('physical_address')), time.time()]
+            )
+            self.pending_writes += 1
+
+            now = time.monotonic()
+            if self.pending_writes >= self.commit_every or now - self.last_commit >= self.commit_interval:
+                self._commit(now)
+
+    def flush(self):
+        with self.lock:
+            self._commit(time.monotonic())
+
+    def _commit(self, now):
+        self.conn.commit()
+        self.pending_writes = 0
+        self.last_commit = now
+
+    def count(self, job_id):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM records WHERE job_id = ?', (job_id,)).fetchone()[0]
+
+    def iter_records(self, job_id, batch_size=1000, **filters):
+        """Yield a job's records as CarrierRecords in MC order, reading batch_size rows at a time.
+
+        Optional filters: mc_number, usdot_number, state, entity_type (exact match).
+        """
+        clauses = ['job_id = ?']
+        params = [job_id]
+        for field in ('mc_number', 'usdot_number', 'state', 'entity_type'):
+            if filters.get(field):
+                clauses.append(f'{field} = ?')
+                params.append(str(filters[field]))
+
+        last_mc = -1
+        while True:
+            # Keyset pagination so each batch is an index seek and no cursor stays open
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT mc_int, {', '.join(RECORD_FIELDS)} FROM records "
+                    f"WHERE {' AND '.join(clauses)} AND mc_int > ? ORDER BY mc_int LIMIT ?",
+                    params + [last_mc, batch_size]
+                ).fetchall()
+
+            if not rows:
+                return
+
+            for row in rows:
+                yield CarrierRecord.from_row(row[1:])
+            last_mc = rows[-1][0]
+
+    def clear(self, job_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM records WHERE job_id = ?', (job_id,))
+            self._commit(time.monotonic())
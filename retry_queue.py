@@ -0,0 +1,71 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+
+def backoff_delay(attempt, base_delay=2.0, max_delay=120.0, retry_after=None):
+    """Seconds to wait before retry number `attempt` (1-based): full-jitter exponential backoff.
+
+    A Retry-After from the server is honoured as a floor.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+    if retry_after:
+        delay = max(delay, min(float(retry_after), max_delay))
+    return delay
+
+
+class RetryQueue:
+    """MC numbers waiting to be retried after a transient failure, ordered by due time.
+
+    Each entry keeps the attempt count and an optional payload (the snapshot
+    record when only enrichment failed), so a retry can skip work that
+    already succeeded. push() refuses an entry once it has used max_attempts,
+    and the caller then settles the MC as an error.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=2.0, max_delay=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.heap = []
+        self.sequence = itertools.count()
+        self.stats_counts = {'retried': 0, 'gave_up': 0}
+        self.lock = threading.Lock()
+
+    def push(self, mc_number, attempt, payload=None, retry_after=None):
+        """Schedule retry number `attempt` of an MC number. False if it has run out of attempts."""
+        with self.lock:
+            if attempt > self.max_attempts:
+                self.stats_counts['gave_up'] += 1
+                return False
+            due = time.monotonic() + backoff_delay(attempt, self.base_delay, self.max_delay, retry_after)
+            heapq.heappush(self.heap, (due, next(self.sequence), mc_number, attempt, payload))
+            self.stats_counts['retried'] += 1
+            return True
+
+    def pop_due(self):
+        """(mc_number, attempt, payload) of the earliest retry that is due, or None"""
+        with self.lock:
+            if self.heap and self.heap[0][0] <= time.monotonic():
+                _, _, mc_number, attempt, payload = heapq.heappop(self.heap)
+                return mc_number, attempt, payload
+            return None
+
+    def next_due_in(self):
+        """Seconds until the earliest retry is due, or None if nothing is waiting"""
+        with self.lock:
+            if not self.heap:
+                return None
+            return max(0.0, self.heap[0][0] - time.monotonic())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.stats_counts)
+            stats['waiting'] = len(self.heap)
+        return stats
@@ -1,85 +1,675 @@
 import requests
-from bs4 import BeautifulSoup
+import queue
+import threading
 import time
 import re
+from contextlib import nullcontext
 from urllib.parse import urljoin
+from rate_limiter import RateController
+from circuit_breaker import CircuitBreaker
+from retry_queue import RetryQueue
+from registration_resolver import RegistrationResolver
+from change_tracker import page_hash
+from carrier_record import CarrierRecord
+from http_transport import SAFER_BASE_URL, SMS_BASE_URL, SNAPSHOT_HEADERS, SMS_HEADERS, get_transport
+import parsers
+
+def _phrase_pattern(phrase):
+    # In raw HTML the words may be split by whitespace, &nbsp; or inline tags
+    gap = rb'(?:\s|&nbsp;|<[^>]*>)+'
+    return re.compile(gap.join(re.escape(word.encode()) for word in phrase.split()), re.IGNORECASE)
+
+# SAFER responses that can never hold a record: (outcome, phrase, log message, byte pattern)
+SNAPSHOT_MARKERS = [
+    (outcome, phrase, message, _phrase_pattern(phrase))
+    for outcome, phrase, message in [
+        ('not_found', 'record not found', 'Record not found'),
+        ('not_found', 'no records matching', 'No records matching'),
+        ('bad_query', 'querybadcharacter', 'Bad character in query'),
+        ('inactive', 'record inactive', 'Record inactive'),
+        ('inactive', 'is inactive in the safer database', 'Inactive in SAFER database'),
+    ]
+]
+
+def classify_snapshot(content):
+    """Classify a raw SAFER snapshot response without building a DOM.
+    
+    Returns (outcome, message) where outcome is 'not_found', 'inactive' or
+    'bad_query', or ('candidate', None) when the page may hold a real record
+    and needs a full parse.
+    """
+    for outcome, phrase, message, pattern in SNAPSHOT_MARKERS:
+        if pattern.search(content):
+            return outcome, message
+    return 'candidate', None
+
+class ScrapeStopped(Exception):
+    """Raised when a request is abandoned because the scraper was stopped"""
+    pass
+
+class TransientFetchError(Exception):
+    """A request failed in a way worth retrying later: timeout, connection error, 429 or 5xx"""
+    
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Network errors that say nothing about the record itself
+TRANSIENT_ERRORS = (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
+
+def is_valid_record(data, entity_type):
+    """Check if a record meets all filtering criteria for entity_type (Carrier, Broker or Shipper)"""
+    try:
+        # Check if we have basic required data
+        if not data.get('legal_name'):
+            return False
+            
+        # Check Entity Type (be more flexible for initial testing)
+        record_type = data.get('entity_type', '').lower()
+        target_type = entity_type.lower()
+        
+        # For now, accept any entity type that has content
+        # In production, you would uncomment the strict checking below
+        if not record_type:
+            # If no entity type found, accept record (could be missing from scraping)
+            pass
+        else:
+            # Allow partial matches for entity type
+            if target_type == 'carrier' and 'carrier' not in record_type:
+                return False
+            elif target_type == 'broker' and 'broker' not in record_type:
+                return False
+            elif target_type == 'shipper' and 'shipper' not in record_type:
+                return False
+        
+        # Check USDOT Status (be more flexible)
+        usdot_status = data.get('usdot_status', '').lower()
+        # For now, don't filter by status - accept all active records
+        
+        # Check Out of Service Date (should be None/empty)
+        oos_date = data.get('out_of_service_date', '').lower()
+        if oos_date and oos_date not in ['none', 'n/a', '', 'null', 'not applicable']:
+            # Check if it's actually a date with numbers (indicating out of service)
+            if re.search(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}', oos_date):
+                return False
+        
+        # Check Operating Authority Status (be more flexible)
+        auth_status = data.get('operating_authority_status', '').lower()
+        # For now, don't filter by authority status
+        
+        return True
+        
+    except Exception as e:
+        return False
 
 class FMCSAScraper:
-    def __init__(self, start_mc, end_mc=None, entity_type='Carrier'):
+    def __init__(self, start_mc, end_mc=None, entity_type='Carrier', workers=1, rate_controller=None, cache=None, job=None, store=None, parser_backend=None,
+                 negative_index=None, recheck_interval=30 * 24 * 3600, negative_policy='skip', metrics=None,
+                 enrich_workers=None, registration_resolver=None, census=None, census_only=False, tracker=None,
+                 mc_numbers=None, circuit_breaker=None, max_retries=4, transport=None):
         self.start_mc = start_mc
         self.end_mc = end_mc
+        # Optional explicit MC numbers to scan (any iterable) instead of the start_mc..end_mc range
+        self.mc_numbers = mc_numbers
         self.entity_type = entity_type
+        self.workers = max(1, int(workers or 1))
+        # Threads for the SMS/registration stage; defaults to one per snapshot worker
+        self.enrich_workers = max(1, int(enrich_workers or self.workers))
         self.should_stop = False
-        self.session = requests.Session()
-        
-        # Set headers to mimic a browser
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        self._stop_event = threading.Event()
+        
+        # Per-host adaptive throttling shared by every request this scraper makes
+        self.rate_controller = rate_controller or RateController()
+        
+        # Holds requests to a host that keeps failing; share one between scrapers like the rate controller
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        
+        # MC numbers that failed transiently, retried with backoff once they are due
+        self.retry_queue = RetryQueue(max_attempts=max_retries)
+        self._fresh_exhausted = False
+        self._in_flight = 0
+        
+        # Optional per-job gate on a limiter shared between jobs (see job_scheduler.RequestGate)
+        self.request_gate = None
+        
+        # Optional on-disk response cache (see response_cache.ResponseCache)
+        self.cache = cache
+        
+        # Optional journaled job (see job_journal.ScanJob) for resumable scans
+        self.job = job
+        
+        # Optional persistent result store (see result_store.ResultStore)
+        self.store = store
+        
+        # HTML parser backend for extraction (see parsers.available_backends)
+        self.parser_backend = parser_backend or parsers.default_backend()
+        
+        # Optional index of MC numbers with no usable record (see negative_index.NegativeIndex).
+        # Numbers checked within recheck_interval seconds are skipped, or with
+        # negative_policy='defer' scanned after the rest of a bounded range.
+        self.negative_index = negative_index
+        self.recheck_interval = recheck_interval
+        self.negative_policy = negative_policy
+        self.negative_skipped = 0
+        
+        # How many snapshot pages were settled by classify_snapshot vs fully parsed
+        self.snapshot_stats = {'classified': 0, 'parsed': 0, 'census': 0}
+        self._stats_lock = threading.Lock()
+        
+        # Records that went on to enrichment vs were filtered out by the snapshot stage
+        self.pipeline_stats = {'enriched': 0, 'enrichment_avoided': 0}
+        
+        # Builds registration URLs from USDOT numbers; share one between scrapers to share what it learns
+        self.registration_resolver = registration_resolver or RegistrationResolver(SMS_BASE_URL)
+        
+        # Optional local census (see census_store.CensusStore). MC numbers it holds are
+        # answered from it without a snapshot request; with census_only=True numbers
+        # missing from it count as not found instead of being scraped live.
+        self.census = census
+        self.census_only = census_only
+        
+        # Optional change tracker (see change_tracker.ChangeTracker) for incremental re-scans:
+        # unchanged pages aren't re-parsed and only added/changed records are stored and reported
+        self.tracker = tracker
+        # Changes are logged under the job id, or a per-run id when there is no journaled job
+        self.run_id = job.job_id if job is not None else int(time.time() * 1000)
+        self.change_stats = {'snapshot_unchanged': 0, 'registration_unchanged': 0, 'not_modified': 0}
+        self._pages = {}
+        
+        # Optional per-stage latency and outcome metrics (see metrics.ScrapeMetrics)
+        self.metrics = metrics
+        # Per-worker detail of why the current MC's snapshot held no record
+        self._local = threading.local()
+        
+        # Pooled keep-alive connections shared with every other scraper (see http_transport)
+        self.transport = transport or get_transport()
+        self.session = self.transport.session
     
     def stop(self):
         self.should_stop = True
+        self._stop_event.set()
+    
+    def wait(self, seconds):
+        """Sleep for the given time, returning early if the scraper is stopped"""
+        return self._stop_event.wait(seconds)
+    
+    def request(self, method, url, **kwargs):
+        """Send a request through the session, paced by the per-host rate controller.
+        
+        Raises TransientFetchError for timeouts, connection errors and
+        429/5xx responses, which also count against the host's circuit breaker.
+        """
+        if not self.circuit_breaker.allow(url, self._stop_event):
+            raise ScrapeStopped('Scraper stopped')
+        
+        gate = self.request_gate
+        if gate is not None and not gate.acquire(self._stop_event):
+            raise ScrapeStopped('Scraper stopped')
+        
+        try:
+            if not self.rate_controller.acquire(url, self._stop_event):
+                raise ScrapeStopped('Scraper stopped')
+            
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                self.rate_controller.record_error(url)
+                self.circuit_breaker.record_failure(url)
+                raise TransientFetchError(f'{type(e).__name__}: {e}') from e
+        finally:
+            if gate is not None:
+                gate.release()
+        
+        retry_after = self.rate_controller.record_response(url, response)
+        if response.status_code in self.rate_controller.RETRYABLE_STATUS:
+            self.circuit_breaker.record_failure(url)
+            raise TransientFetchError(f'HTTP {response.status_code}', retry_after)
+        self.circuit_breaker.record_success(url)
+        return response
+    
+    def fetch(self, page_type, cache_key, method, url, **kwargs):
+        """Fetch a page, serving it from the response cache when a fresh copy exists.
+        
+        Cache hits skip both the network and the rate controller.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(page_type, cache_key)
+            if cached is not None:
+                return cached
+        
+        response = self.request(method, url, **kwargs)
+        
+        if self.cache is not None:
+            self.cache.put(page_type, cache_key, response)
+        return response
+    
+    def get_rates(self):
+        """Current request rate per host (requests per second)"""
+        return self.rate_controller.get_rates()
+    
+    def get_parse_stats(self):
+        """Snapshot pages classified from raw bytes vs fully parsed (and MCs answered by the census),
+        and the share of fetched pages that skipped parsing"""
+        with self._stats_lock:
+            stats = dict(self.snapshot_stats)
+        total = stats['classified'] + stats['parsed']
+        stats['skip_ratio'] = round(stats['classified'] / total, 3) if total else 0.0
+        return stats
+    
+    def stage(self, name):
+        """Context manager timing one stage of an MC's scrape into the metrics, if enabled"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.time(name)
+    
+    def _count_snapshot(self, key):
+        with self._stats_lock:
+            self.snapshot_stats[key] += 1
+    
+    def iter_mc_numbers(self, progress_callback=None):
+        """Yield the MC numbers to scan, skipping ones a resumed job already finished.
+        
+        Known dead numbers that are skipped are still reported and journaled (see skip_mc).
+        """
+        if self.job is not None:
+            mc_numbers = self.job.iter_pending()
+        else:
+            mc_numbers = self._iter_range()
+        
+        if self.negative_index is None:
+            yield from mc_numbers
+            return
+        
+        deferred = []
+        for mc_number in mc_numbers:
+            if not self.negative_index.is_dead(mc_number, self.recheck_interval):
+                yield mc_number
+            elif self.negative_policy == 'defer' and self.end_mc:
+                deferred.append(mc_number)
+            else:
+                self.skip_mc(mc_number, progress_callback)
+        
+        # Known dead numbers go last, once every live candidate has been tried
+        yield from deferred
+    
+    def skip_mc(self, mc_number, progress_callback):
+        """Settle a known dead MC number without fetching it, so checkpoints and counts move past it"""
+        self.negative_skipped += 1
+        if progress_callback is not None:
+            progress_callback(mc_number, 'Skipped (known dead)')
+        self.record_outcome(mc_number, 'skipped')
+    
+    def _iter_range(self):
+        if self.mc_numbers is not None:
+            yield from self.mc_numbers
+            return
+        mc_number = self.start_mc
+        while not self.end_mc or mc_number <= self.end_mc:
+            yield mc_number
+            mc_number += 1
+    
+    def note_snapshot_outcome(self, mc_number, outcome):
+        """Record a snapshot outcome in the negative index; outcome None marks a live record"""
+        self._local.snapshot_outcome = outcome
+        if self.negative_index is not None:
+            self.negative_index.record(mc_number, outcome)
+    
+    def process_mc(self, mc_number, progress_callback, attempt=0, snapshot=None):
+        """Scrape one MC number, report its outcome and record it in the job journal"""
+        started = self.begin_mc(mc_number, progress_callback, attempt)
+        
+        try:
+            # Scrape individual MC; a retry whose snapshot already succeeded skips straight to enrichment
+            if snapshot is None:
+                result = self.scrape_snapshot(mc_number)
+                if isinstance(result, dict):
+                    snapshot = result
+            if snapshot is not None:
+                result = self.get_enhanced_carrier_data(dict(snapshot))
+        except TransientFetchError as e:
+            self.retry_mc(mc_number, progress_callback, e, started, attempt, snapshot)
+            return
+        except Exception as e:
+            self.fail_mc(mc_number, progress_callback, e, started)
+            return
+        
+        self.finish_mc(mc_number, progress_callback, result, started)
+    
+    def next_work(self, mc_numbers):
+        """Next (mc_number, attempt, snapshot) to process, or None when the scan is done.
+        
+        Retries that are due go first. Once the fresh MC numbers run out this
+        waits for pending retries, and for MC numbers still in progress that
+        may yet fail and need one.
+        """
+        while not self.should_stop:
+            work = self.retry_queue.pop_due()
+            if work is None and not self._fresh_exhausted:
+                mc_number = next(mc_numbers, None)
+                if mc_number is None:
+                    self._fresh_exhausted = True
+                else:
+                    work = (mc_number, 0, None)
+            if work is not None:
+                with self._stats_lock:
+                    self._in_flight += 1
+                return work
+            
+            wait_time = self.retry_queue.next_due_in()
+            with self._stats_lock:
+                in_flight = self._in_flight
+            if wait_time is None and not in_flight:
+                return None
+            self._stop_event.wait(min(wait_time if wait_time is not None else 0.2, 1.0))
+        return None
+    
+    def _settle(self):
+        with self._stats_lock:
+            self._in_flight -= 1
+    
+    def begin_mc(self, mc_number, progress_callback, attempt=0):
+        if attempt:
+            progress_callback(mc_number, f'Checking MC {mc_number} (retry {attempt})...')
+        else:
+            progress_callback(mc_number, f'Checking MC {mc_number}...')
+        self._local.snapshot_outcome = None
+        return time.perf_counter()
+    
+    def retry_mc(self, mc_number, progress_callback, error, started, attempt, snapshot=None):
+        """Queue an MC number that failed transiently for a later retry, or fail it once out of attempts"""
+        if self.should_stop:
+            # Left unjournaled, so a resumed job tries it again
+            self._settle()
+            return
+        if self.retry_queue.push(mc_number, attempt + 1, snapshot, error.retry_after):
+            progress_callback(mc_number, f'Retrying later: {error}')
+            self._settle()
+            return
+        if snapshot is not None:
+            # The snapshot record is real; keep it without what enrichment would have added
+            print(f"MC {mc_number}: enrichment failed after {attempt} retries ({error}), keeping snapshot data")
+            self.finish_mc(mc_number, progress_callback, snapshot, started)
+            return
+        self.fail_mc(mc_number, progress_callback, error, started)
+    
+    def fail_mc(self, mc_number, progress_callback, error, started):
+        self._settle()
+        if self.should_stop:
+            return
+        progress_callback(mc_number, f'Error: {str(error)}')
+        if self.tracker is not None:
+            # A failed MC says nothing about its record; keep the last scan's state
+            with self._stats_lock:
+                self._pages.pop(int(mc_number), None)
+        self.record_outcome(mc_number, 'error')
+        self.count_outcome('error', started)
+    
+    def finish_mc(self, mc_number, progress_callback, result, started):
+        """Report and record the final result of an MC number: None, 'invalid' or a record"""
+        self._settle()
+        # A stop can interrupt the requests for this MC; leave it for a resumed job
+        if self.should_stop:
+            return
+        
+        if isinstance(result, dict):
+            # Keep only the output fields, in slots; scraper-only keys like sms_url end here
+            result = CarrierRecord.from_dict(result)
+        change = self.track_change(mc_number, result)
+        
+        if result is None and self._local.snapshot_outcome == 'error':
+            # The snapshot request failed for good; that says nothing about whether the record exists
+            progress_callback(mc_number, 'Error: snapshot request failed')
+            self.record_outcome(mc_number, 'error')
+            self.count_outcome('error', started)
+        elif result is None:
+            progress_callback(mc_number, 'Not found')
+            self.record_outcome(mc_number, 'not_found')
+            self.count_outcome(self._local.snapshot_outcome or 'not_found', started)
+        elif result == 'invalid':
+            progress_callback(mc_number, 'Invalid (filtered out)')
+            self.record_outcome(mc_number, 'invalid')
+            self.count_outcome('invalid', started)
+        elif change == 'unchanged':
+            # Incremental re-scan: same record as last time, so it isn't output again
+            progress_callback(mc_number, 'Unchanged')
+            self.record_outcome(mc_number, 'valid', result, store=False)
+            self.count_outcome('valid', started)
+        else:
+            progress_callback(mc_number, 'valid', result)
+            self.record_outcome(mc_number, 'valid', result)
+            self.count_outcome('valid', started)
+    
+    def count_outcome(self, outcome, started):
+        if self.metrics is not None:
+            self.metrics.record_mc(outcome, time.perf_counter() - started)
+    
+    def record_outcome(self, mc_number, outcome, result=None, store=True):
+        # Add the record before journaling it; the journal flushes the store before each commit,
+        # so a resumed job never skips an MC whose record wasn't saved
+        if self.store is not None and outcome == 'valid' and store:
+            self.store.add(self.job.job_id if self.job else 0, result)
+        if self.job is not None:
+            self.job.record(mc_number, outcome)
+    
+    def note_pages(self, mc_number, **pages):
+        """Collect page state for the change tracker until the MC number is finished"""
+        if self.tracker is None:
+            return
+        with self._stats_lock:
+            self._pages.setdefault(int(mc_number), {}).update(pages)
+    
+    def track_change(self, mc_number, result):
+        """Hand an MC's pages and final record to the change tracker.
+        
+        Returns 'added', 'changed', 'removed' or 'unchanged', or None when not
+        tracking or when the snapshot couldn't be fetched (which says nothing
+        about the record).
+        """
+        if self.tracker is None:
+            return None
+        with self._stats_lock:
+            pages = self._pages.pop(int(mc_number), {})
+        if result is None and self._local.snapshot_outcome == 'error':
+            return None
+        record = result if isinstance(result, CarrierRecord) else None
+        return self.tracker.update(self.run_id, self.entity_type, mc_number, pages, record)
+    
+    def get_change_stats(self):
+        """Pages skipped as unchanged during an incremental re-scan, and the run's changes so far"""
+        with self._stats_lock:
+            stats = dict(self.change_stats)
+        if self.tracker is not None:
+            stats.update(self.tracker.count_changes(self.run_id))
+        return stats
+    
+    def _count_change(self, key):
+        with self._stats_lock:
+            self.change_stats[key] += 1
+    
+    def get_pipeline_stats(self):
+        """Records sent to enrichment vs filtered out before it"""
+        with self._stats_lock:
+            return dict(self.pipeline_stats)
+    
+    def _count_enrichment(self, key):
+        with self._stats_lock:
+            self.pipeline_stats[key] += 1
+        if self.metrics is not None:
+            self.metrics.enrichment.inc(decision=key)
     
     def scrape(self, progress_callback, complete_callback):
         """Main scraping method"""
+        if self.workers > 1 or self.enrich_workers > 1:
+            return self.scrape_concurrent(progress_callback, complete_callback)
+        
         current_mc = self.start_mc
+        mc_numbers = self.iter_mc_numbers(progress_callback)
         
         try:
-            while not self.should_stop:
-                # Check if we've reached the end MC
-                if self.end_mc and current_mc > self.end_mc:
+            while True:
+                work = self.next_work(mc_numbers)
+                if work is None:
                     break
+                current_mc, attempt, snapshot = work
+                self.process_mc(current_mc, progress_callback, attempt, snapshot)
                 
-                progress_callback(current_mc, f'Checking MC {current_mc}...')
+        except Exception as e:
+            progress_callback(current_mc, f'Scraping failed: {str(e)}')
+        
+        finally:
+            complete_callback()
+    
+    def scrape_concurrent(self, progress_callback, complete_callback):
+        """Scrape the MC range as a two-stage pipeline of worker threads.
+        
+        Snapshot workers pull the next MC number from a shared iterator, so the
+        range is split dynamically and slow MC numbers don't hold up the others.
+        They fetch and filter the snapshot, settling most MC numbers on the spot;
+        only records that pass every filter are queued for the enrichment
+        workers, which fetch the SMS and registration pages. The queue is
+        bounded so snapshot workers can't run far ahead of enrichment.
+        
+        Calls to progress_callback are serialized so callers see the same
+        contract as the sequential scan, and complete_callback fires once after
+        every worker exits.
+        """
+        counter_lock = threading.Lock()
+        callback_lock = threading.Lock()
+        last_mc = [self.start_mc]
+        enrich_queue = queue.Queue(maxsize=self.enrich_workers * 2)
+        
+        def report(mc_number, status, data=None):
+            with callback_lock:
+                progress_callback(mc_number, status, data)
+        
+        mc_numbers = self.iter_mc_numbers(report)
+        
+        def claim_mc():
+            with counter_lock:
+                work = self.next_work(mc_numbers)
+                if work is not None:
+                    last_mc[0] = work[0]
+                return work
+        
+        def snapshot_worker():
+            while not self.should_stop:
+                work = claim_mc()
+                if work is None:
+                    break
                 
+                mc_number, attempt, snapshot = work
+                started = self.begin_mc(mc_number, report, attempt)
+                if snapshot is not None:
+                    # Only enrichment failed last time; the snapshot record still stands
+                    enrich_queue.put((mc_number, snapshot, started, attempt))
+                    continue
                 try:
-                    # Scrape individual MC
-                    result = self.scrape_mc(current_mc)
-                    
-                    if result is None:
-                        progress_callback(current_mc, 'Not found')
-                    elif result == 'invalid':
-                        progress_callback(current_mc, 'Invalid (filtered out)')
-                    else:
-                        progress_callback(current_mc, 'valid', result)
-                    
+                    result = self.scrape_snapshot(mc_number)
+                except TransientFetchError as e:
+                    self.retry_mc(mc_number, report, e, started, attempt)
+                    continue
                 except Exception as e:
-                    progress_callback(current_mc, f'Error: {str(e)}')
+                    self.fail_mc(mc_number, report, e, started)
+                    continue
                 
-                # Delay to avoid being blocked
-                time.sleep(1)
-                current_mc += 1
+                if isinstance(result, dict):
+                    enrich_queue.put((mc_number, result, started, attempt))
+                else:
+                    self.finish_mc(mc_number, report, result, started)
+        
+        def enrich_worker():
+            while True:
+                item = enrich_queue.get()
+                if item is None:
+                    break
                 
+                mc_number, main_data, started, attempt = item
+                try:
+                    result = self.get_enhanced_carrier_data(dict(main_data))
+                except TransientFetchError as e:
+                    self.retry_mc(mc_number, report, e, started, attempt, main_data)
+                    continue
+                except Exception as e:
+                    self.fail_mc(mc_number, report, e, started)
+                    continue
+                self.finish_mc(mc_number, report, result, started)
+        
+        snapshot_threads = [
+            threading.Thread(target=snapshot_worker, name=f'mc-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        enrich_threads = [
+            threading.Thread(target=enrich_worker, name=f'enrich-worker-{i}', daemon=True)
+            for i in range(self.enrich_workers)
+        ]
+        
+        try:
+            for thread in snapshot_threads + enrich_threads:
+                thread.start()
+            for thread in snapshot_threads:
+                thread.join()
+        
         except Exception as e:
-            progress_callback(current_mc, f'Scraping failed: {str(e)}')
+            report(last_mc[0], f'Scraping failed: {str(e)}')
         
         finally:
+            # Let the enrichment stage drain what was queued, then finish
+            for _ in enrich_threads:
+                enrich_queue.put(None)
+            for thread in enrich_threads:
+                thread.join()
             complete_callback()
     
-    def scrape_mc(self, mc_number):
-        """Scrape data for a single MC number using complete FMCSA workflow"""
+    def scrape_snapshot(self, mc_number):
+        """Snapshot stage: fetch the snapshot (or read the census) and apply every filter it can answer.
         
-        # Step 1: Get main carrier snapshot
-        main_data = self.get_main_carrier_data(mc_number)
+        is_valid_record only looks at snapshot fields, so records it rejects
+        never pay for the SMS and registration round-trips. Returns None,
+        'invalid', or the snapshot record to enrich.
+        """
+        main_data = self.get_census_data(mc_number) if self.census is not None else False
+        if main_data is False:
+            main_data = self.get_main_carrier_data(mc_number)
         if not main_data:
             return None
         
-        # Step 2: Get additional details from SMS and Registration pages
-        enhanced_data = self.get_enhanced_carrier_data(main_data)
+        with self.stage('validation'):
+            valid = self.is_valid_record(main_data)
         
-        if enhanced_data and self.is_valid_record(enhanced_data):
-            return enhanced_data
-        else:
-            return 'invalid' if enhanced_data else None
+        if not valid:
+            if main_data.get('usdot_number') or main_data.get('sms_url'):
+                self._count_enrichment('enrichment_avoided')
+            return 'invalid'
+        
+        self._count_enrichment('enriched')
+        return main_data
+    
+    def get_census_data(self, mc_number):
+        """Snapshot-equivalent record from the census, None if the census rules it out,
+        or False if the live snapshot is still needed"""
+        with self.stage('census_lookup'):
+            record = self.census.get(mc_number)
+        
+        if record is None:
+            if self.census_only:
+                self._local.snapshot_outcome = 'not_found'
+                return None
+            return False
+        
+        if record.get('usdot_status', '').upper() == 'INACTIVE':
+            self._local.snapshot_outcome = 'inactive'
+            return None
+        
+        # Without a name the census row can't stand in for the snapshot
+        if not record.get('legal_name'):
+            return False
+        
+        self._count_snapshot('census')
+        return record
     
     def get_main_carrier_data(self, mc_number):
         """Get main carrier data from FMCSA snapshot - MC search only"""
-        url = 'https://safer.fmcsa.dot.gov/query.asp'
+        url = SAFER_BASE_URL + '/query.asp'
         
         # Only search by MC number - do NOT fall back to USDOT search
         params = {
@@ -90,79 +680,95 @@ class FMCSAScraper:
         }
         
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Origin': 'https://safer.fmcsa.dot.gov',
-                'Referer': 'https://safer.fmcsa.dot.gov/CompanySnapshot.aspx',
-            }
+            with self.stage('snapshot_fetch'):
+                response = self.fetch('snapshot', mc_number, 'POST', url, data=params, headers=SNAPSHOT_HEADERS, timeout=15)
+                response.raise_for_status()
             
-            response = self.session.post(url, data=params, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            page_text = soup.get_text().lower()
-            
-            # Check for specific error conditions and inactive records
-            # Be very specific to avoid false positives from help text
-            if 'record not found' in page_text:
-                print(f"MC {mc_number}: Record not found - skipping")
-                return None
-            elif 'no records matching' in page_text:
-                print(f"MC {mc_number}: No records matching - skipping") 
-                return None
-            elif 'querybadcharacter' in page_text:
-                print(f"MC {mc_number}: Bad character in query - skipping")
-                return None
-            elif 'record inactive' in page_text:
-                print(f"MC {mc_number}: Record inactive - skipping")
-                return None
-            elif 'is inactive in the safer database' in page_text:
-                print(f"MC {mc_number}: Inactive in SAFER database - skipping")
-                return None
+            if self.tracker is not None:
+                # Same page as last scan: reuse what was extracted from it instead of parsing
+                digest = page_hash(response.content)
+                state = self.tracker.get(self.entity_type, mc_number)
+                self.note_pages(mc_number, snapshot_hash=digest)
+                if state and state['snapshot_hash'] == digest and state['snapshot_data']:
+                    self._count_change('snapshot_unchanged')
+                    self.note_pages(mc_number, snapshot_data=state['snapshot_data'])
+                    return dict(state['snapshot_data'])
             
-            # Extract data from main page
-            data = self.extract_main_data(soup, mc_number)
-            
-            # Validate that we actually found an MC record for this specific number
-            if not self.validate_mc_match(soup, mc_number):
-                print(f"MC {mc_number}: MC number mismatch - skipping")
-                return None
-            
-            # Get USDOT number from MC link if available
-            if not data.get('usdot_number'):
-                mc_links = soup.find_all('a', href=re.compile(r'n_dotno=(\d+)'))
-                for link in mc_links:
-                    href = link.get('href', '')
-                    usdot_match = re.search(r'n_dotno=(\d+)', href)
-                    if usdot_match:
-                        data['usdot_number'] = usdot_match.group(1)
-                        break
-            
-            # Find SMS Results link for later use
-            sms_links = soup.find_all('a', href=re.compile(r'sms.*safer_xfr.*DOT=(\d+)'))
-            if sms_links:
-                href = sms_links[0].get('href', '')
-                data['sms_url'] = href if href.startswith('http') else 'http://ai.fmcsa.dot.gov' + href
-            
-            # Additional validation - ensure we have meaningful data
-            if data.get('legal_name') and len(data['legal_name'].strip()) > 0:
-                return data
-            else:
-                print(f"MC {mc_number}: No valid legal name found - skipping")
-                return None
-                
+            with self.stage('snapshot_parse'):
+                data = self.parse_snapshot(response.content, mc_number)
+            self.note_pages(mc_number, snapshot_data=dict(data) if data else None)
+            return data
+        
+        except (TransientFetchError, ScrapeStopped):
+            # Retried later, not reported as not found
+            raise
         except Exception as e:
+            # finish_mc reports and journals this as an error, not as not found
+            self._local.snapshot_outcome = 'error'
             print(f"MC {mc_number}: Exception - {str(e)}")
             return None
     
-    def validate_mc_match(self, soup, mc_number):
+    def parse_snapshot(self, content, mc_number):
+        """Parse a SAFER snapshot page into a record, or None if it holds no usable record"""
+        # Most pages in an open range are not-found or inactive; settle those without a DOM
+        outcome, message = classify_snapshot(content)
+        if outcome != 'candidate':
+            self._count_snapshot('classified')
+            self.note_snapshot_outcome(mc_number, outcome)
+            print(f"MC {mc_number}: {message} - skipping")
+            return None
+        
+        self._count_snapshot('parsed')
+        doc = parsers.parse(content, self.parser_backend)
+        page_text = doc.get_text()
+        lower_text = page_text.lower()
+        
+        # Check for specific error conditions and inactive records
+        # Be very specific to avoid false positives from help text
+        for outcome, phrase, message, pattern in SNAPSHOT_MARKERS:
+            if phrase in lower_text:
+                self.note_snapshot_outcome(mc_number, outcome)
+                print(f"MC {mc_number}: {message} - skipping")
+                return None
+        
+        # Extract data from main page
+        data = self.extract_main_data(doc, mc_number)
+        
+        # Validate that we actually found an MC record for this specific number
+        if not self.validate_mc_match(doc, mc_number, page_text):
+            self.note_snapshot_outcome(mc_number, 'mismatch')
+            print(f"MC {mc_number}: MC number mismatch - skipping")
+            return None
+        
+        # Get USDOT number from MC link if available
+        if not data.get('usdot_number'):
+            for href in doc.find_links(re.compile(r'n_dotno=(\d+)')):
+                usdot_match = re.search(r'n_dotno=(\d+)', href)
+                if usdot_match:
+                    data['usdot_number'] = usdot_match.group(1)
+                    break
+        
+        # Find SMS Results link for later use
+        sms_links = doc.find_links(re.compile(r'sms.*safer_xfr.*DOT=(\d+)'))
+        if sms_links:
+            href = sms_links[0]
+            data['sms_url'] = href if href.startswith('http') else SMS_BASE_URL + href
+        
+        # Additional validation - ensure we have meaningful data
+        if data.get('legal_name') and len(data['legal_name'].strip()) > 0:
+            self.note_snapshot_outcome(mc_number, None)
+            return data
+        else:
+            self.note_snapshot_outcome(mc_number, 'no_name')
+            print(f"MC {mc_number}: No valid legal name found - skipping")
+            return None
+    
+    def validate_mc_match(self, doc, mc_number, page_text=None):
         """Validate that the returned page actually matches the requested MC number"""
         try:
             # Look for MC number in the page content
-            page_text = soup.get_text()
+            if page_text is None:
+                page_text = doc.get_text()
             
             # Check if the MC number appears in the expected format
             mc_patterns = [
@@ -177,9 +783,7 @@ class FMCSAScraper:
                     return True
             
             # Also check in MC links
-            mc_links = soup.find_all('a', href=re.compile(r'n_docketno=(\d+)'))
-            for link in mc_links:
-                href = link.get('href', '')
+            for href in doc.find_links(re.compile(r'n_docketno=(\d+)')):
                 docket_match = re.search(r'n_docketno=(\d+)', href)
                 if docket_match and docket_match.group(1) == str(mc_number):
                     return True
@@ -190,57 +794,143 @@ class FMCSAScraper:
             return False
     
     def get_enhanced_carrier_data(self, main_data):
-        """Get enhanced data from SMS and Registration pages"""
-        if not main_data.get('sms_url'):
+        """Get enhanced data from the Registration page, found directly or through the SMS page"""
+        usdot_number = main_data.get('usdot_number')
+        if not usdot_number and main_data.get('sms_url'):
+            dot_match = re.search(r'DOT=(\d+)', main_data['sms_url'])
+            usdot_number = dot_match.group(1) if dot_match else None
+        if not usdot_number and not main_data.get('sms_url'):
+            return main_data
+        
+        # Census records may already carry the email the registration page would add
+        if main_data.get('email'):
             return main_data
         
         try:
-            # Follow SMS Results link
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Referer': 'https://safer.fmcsa.dot.gov/',
-            }
+            headers = SMS_HEADERS
             
-            time.sleep(1)  # Be polite to the server
-            sms_response = self.session.get(main_data['sms_url'], headers=headers, timeout=15)
+            # What the last incremental scan saw on the registration page, if tracking
+            state = self.tracker.get(self.entity_type, main_data['mc_number']) if self.tracker is not None else None
             
-            if sms_response.status_code == 200:
-                sms_soup = BeautifulSoup(sms_response.content, 'html.parser')
-                
-                # Look for Carrier Registration Details link
-                reg_links = sms_soup.find_all('a', string=re.compile(r'Carrier.*Registration.*Details', re.IGNORECASE))
-                
-                if reg_links:
-                    reg_href = reg_links[0].get('href', '')
-                    
-                    if reg_href:
-                        # Follow Registration Details link
-                        if not reg_href.startswith('http'):
-                            base_url = main_data['sms_url'].split('/SMS/')[0] if '/SMS/' in main_data['sms_url'] else 'http://ai.fmcsa.dot.gov'
-                            reg_url = base_url + reg_href if reg_href.startswith('/') else base_url + '/' + reg_href
-                        else:
-                            reg_url = reg_href
-                        
-                        time.sleep(1)  # Be polite
-                        reg_response = self.session.get(reg_url, headers=headers, timeout=15)
-                        
-                        if reg_response.status_code == 200:
-                            reg_soup = BeautifulSoup(reg_response.content, 'html.parser')
-                            
-                            # Extract email and other details from registration page
-                            self.extract_registration_data(reg_soup, main_data)
+            # Build the registration URL from the USDOT number, skipping the SMS page
+            reg_url, reg_response = None, None
+            if usdot_number:
+                reg_url, reg_response = self.fetch_registration_direct(usdot_number, headers, state)
             
-            return main_data
+            # Fall back to following the SMS page's registration link
+            if reg_response is None and main_data.get('sms_url'):
+                reg_url = self.find_registration_url(main_data['sms_url'], headers)
+                if reg_url:
+                    with self.stage('registration_fetch'):
+                        reg_response = self.fetch('registration', reg_url, 'GET', reg_url,
+                                                  headers=self.conditional_headers(headers, reg_url, state), timeout=15)
+                    if usdot_number and reg_response.status_code == 200:
+                        self.registration_resolver.learn(reg_url, usdot_number)
             
+            if reg_response is not None and reg_response.status_code in (200, 304):
+                self.apply_registration(main_data, reg_url, reg_response, state)
+            
+            return main_data
+        
+        except (TransientFetchError, ScrapeStopped):
+            # Retried later rather than silently dropping the enrichment
+            raise
         except Exception as e:
             # Return main data even if enhanced scraping fails
             return main_data
     
-    def is_no_results_page(self, soup):
+    def fetch_registration_direct(self, usdot_number, headers, state=None):
+        """Fetch the registration page by URL pattern. Returns (url, response), or (None, None) if no pattern works."""
+        resolver = self.registration_resolver
+        for pattern, reg_url in resolver.candidates(usdot_number):
+            with self.stage('registration_fetch'):
+                response = self.fetch('registration', reg_url, 'GET', reg_url,
+                                      headers=self.conditional_headers(headers, reg_url, state), timeout=15)
+            # A 304 answers a conditional request for a URL that worked last scan
+            hit = response.status_code == 304 or resolver.accepts(response, usdot_number)
+            resolver.record(pattern, hit)
+            if hit:
+                return reg_url, response
+        return None, None
+    
+    def conditional_headers(self, headers, url, state):
+        """Add If-None-Match/If-Modified-Since when the last scan fetched this URL with validators"""
+        if not state or state.get('registration_url') != url or not state.get('registration_fields'):
+            return headers
+        headers = dict(headers)
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+    
+    def apply_registration(self, main_data, reg_url, reg_response, state):
+        """Extract registration page fields into main_data, reusing last scan's fields if the page is unchanged"""
+        if self.tracker is None:
+            with self.stage('registration_parse'):
+                reg_doc = parsers.parse(reg_response.content, self.parser_backend)
+                
+                # Extract email and other details from registration page
+                self.extract_registration_data(reg_doc, main_data)
+            return
+        
+        state = state or {}
+        if reg_response.status_code == 304:
+            self._count_change('not_modified')
+            digest = state.get('registration_hash')
+        else:
+            digest = page_hash(reg_response.content)
+        
+        if digest and digest == state.get('registration_hash') and state.get('registration_fields') is not None:
+            self._count_change('registration_unchanged')
+            fields = state['registration_fields']
+            main_data.update(fields)
+        else:
+            before = dict(main_data)
+            with self.stage('registration_parse'):
+                reg_doc = parsers.parse(reg_response.content, self.parser_backend)
+                self.extract_registration_data(reg_doc, main_data)
+            fields = {key: value for key, value in main_data.items() if before.get(key) != value}
+        
+        self.note_pages(
+            main_data['mc_number'],
+            registration_url=reg_url,
+            registration_hash=digest,
+            etag=reg_response.headers.get('ETag') or (state.get('etag') if reg_response.status_code == 304 else None),
+            last_modified=reg_response.headers.get('Last-Modified') or (state.get('last_modified') if reg_response.status_code == 304 else None),
+            registration_fields=fields
+        )
+    
+    def find_registration_url(self, sms_url, headers):
+        """Follow the SMS Results link and return the Carrier Registration Details URL on it, or None"""
+        with self.stage('sms_fetch'):
+            sms_response = self.fetch('sms', sms_url, 'GET', sms_url, headers=headers, timeout=15)
+        if sms_response.status_code != 200:
+            return None
+        
+        with self.stage('sms_parse'):
+            # Only the links matter on the SMS page, so skip building the rest of the tree
+            sms_doc = parsers.parse(sms_response.content, self.parser_backend, only=('a',))
+            
+            # Look for Carrier Registration Details link
+            reg_links = self.find_registration_links(sms_doc)
+        
+        reg_href = reg_links[0] if reg_links else None
+        if not reg_href:
+            return None
+        if reg_href.startswith('http'):
+            return reg_href
+        base_url = sms_url.split('/SMS/')[0] if '/SMS/' in sms_url else SMS_BASE_URL
+        return base_url + reg_href if reg_href.startswith('/') else base_url + '/' + reg_href
+    
+    def find_registration_links(self, sms_doc):
+        """hrefs of the Carrier Registration Details links on an SMS page"""
+        return sms_doc.find_links_by_text(re.compile(r'Carrier.*Registration.*Details', re.IGNORECASE))
+    
+    def is_no_results_page(self, doc):
         """Check if the page indicates no results found"""
         # Look for common "no results" indicators
-        page_text = soup.get_text().lower()
+        page_text = doc.get_text().lower()
         no_results_indicators = [
             'no records found',
             'search returned no results', 
@@ -250,7 +940,7 @@ class FMCSAScraper:
         
         return any(indicator in page_text for indicator in no_results_indicators)
     
-    def extract_main_data(self, soup, mc_number):
+    def extract_main_data(self, doc, mc_number):
         """Extract main data from FMCSA carrier snapshot page"""
         data = {
             'mc_number': str(mc_number),
@@ -267,18 +957,14 @@ class FMCSAScraper:
         
         try:
             # Extract using FMCSA table structure
-            rows = soup.find_all('tr')
-            for row in rows:
-                th_elements = row.find_all('th')
-                td_elements = row.find_all('td')
-                
-                if th_elements and td_elements:
+            for th_elements, has_td in doc.rows():
+                if th_elements and has_td:
                     for th in th_elements:
-                        label = th.get_text(strip=True).lower()
-                        next_td = th.find_next('td')
+                        label = doc.node_text(th).lower()
+                        next_td = doc.find_next_td(th)
                         
                         if next_td:
-                            value = next_td.get_text(strip=True)
+                            value = doc.node_text(next_td)
                             
                             if 'legal name' in label:
                                 data['legal_name'] = value
@@ -291,7 +977,7 @@ class FMCSAScraper:
                             elif 'physical address' in label:
                                 # Clean address: combine lines and remove extra spaces
                                 addr_parts = []
-                                for line in next_td.stripped_strings:
+                                for line in doc.stripped_strings(next_td):
                                     if line.strip():
                                         addr_parts.append(line.strip())
                                 data['physical_address'] = ' '.join(addr_parts)
@@ -318,11 +1004,11 @@ class FMCSAScraper:
         except Exception as e:
             return data
     
-    def extract_registration_data(self, soup, data):
+    def extract_registration_data(self, doc, data):
         """Extract additional data from carrier registration details page"""
         try:
             # Look for email in registration page
-            page_text = soup.get_text()
+            page_text = doc.get_text()
             
             # Search for email addresses
             email_matches = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', page_text)
@@ -334,18 +1020,14 @@ class FMCSAScraper:
                         break
             
             # Look for additional phone numbers or updated address
-            rows = soup.find_all('tr')
-            for row in rows:
-                th_elements = row.find_all('th')
-                td_elements = row.find_all('td')
-                
-                if th_elements and td_elements:
+            for th_elements, has_td in doc.rows():
+                if th_elements and has_td:
                     for th in th_elements:
-                        label = th.get_text(strip=True).lower()
-                        next_td = th.find_next('td')
+                        label = doc.node_text(th).lower()
+                        next_td = doc.find_next_td(th)
                         
                         if next_td:
-                            value = next_td.get_text(strip=True)
+                            value = doc.node_text(next_td)
                             
                             if 'email' in label or 'e-mail' in label:
                                 if '@' in value:
@@ -540,48 +1222,7 @@ class FMCSAScraper:
     
     def is_valid_record(self, data):
         """Check if the record meets all filtering criteria"""
-        try:
-            # Check if we have basic required data
-            if not data.get('legal_name'):
-                return False
-                
-            # Check Entity Type (be more flexible for initial testing)
-            entity_type = data.get('entity_type', '').lower()
-            target_type = self.entity_type.lower()
-            
-            # For now, accept any entity type that has content
-            # In production, you would uncomment the strict checking below
-            if not entity_type:
-                # If no entity type found, accept record (could be missing from scraping)
-                pass
-            else:
-                # Allow partial matches for entity type
-                if target_type == 'carrier' and 'carrier' not in entity_type:
-                    return False
-                elif target_type == 'broker' and 'broker' not in entity_type:
-                    return False
-                elif target_type == 'shipper' and 'shipper' not in entity_type:
-                    return False
-            
-            # Check USDOT Status (be more flexible)
-            usdot_status = data.get('usdot_status', '').lower()
-            # For now, don't filter by status - accept all active records
-            
-            # Check Out of Service Date (should be None/empty)
-            oos_date = data.get('out_of_service_date', '').lower()
-            if oos_date and oos_date not in ['none', 'n/a', '', 'null', 'not applicable']:
-                # Check if it's actually a date with numbers (indicating out of service)
-                if re.search(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}', oos_date):
-                    return False
-            
-            # Check Operating Authority Status (be more flexible)
-            auth_status = data.get('operating_authority_status', '').lower()
-            # For now, don't filter by authority status
-            
-            return True
-            
-        except Exception as e:
-            return False
+        return is_valid_record(data, self.entity_type)
     
     def clean_text(self, text):
         """Clean extracted text"""
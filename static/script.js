@@ -7,10 +7,11 @@ const startBtn = document.getElementById('startBtn');
 const stopBtn = document.getElementById('stopBtn');
 const currentStatus = document.getElementById('currentStatus');
 const progressInfo = document.getElementById('progressInfo');
+const rateInfo = document.getElementById('rateInfo');
 const dataTableBody = document.getElementById('dataTableBody');
 const totalRecords = document.getElementById('totalRecords');
 const recordCount = document.getElementById('recordCount');
-const exportButtons = ['exportCsv', 'exportXlsx', 'exportTxt'];
+const exportButtons = ['exportCsv', 'exportXlsx', 'exportTxt', 'exportNdjson'];
 
 // State variables
 let scrapingActive = false;
@@ -38,6 +39,7 @@ function setupEventListeners() {
     socket.on('scraping_complete', handleScrapingComplete);
     socket.on('progress_update', handleProgressUpdate);
     socket.on('data_update', handleDataUpdate);
+    socket.on('job_queued', handleJobQueued);
     socket.on('error', handleError);
     socket.on('license_expired', handleLicenseExpired);
     
@@ -50,6 +52,8 @@ function startScraping() {
     const startMC = document.getElementById('startMC').value;
     const endMC = document.getElementById('endMC').value;
     const entityType = document.getElementById('entityType').value;
+    const workers = document.getElementById('workers').value;
+    const incremental = document.getElementById('incremental').checked;
     
     if (!startMC) {
         showError('Please enter a starting MC number');
@@ -63,7 +67,9 @@ function startScraping() {
     socket.emit('start_scraping', {
         start_mc: startMC,
         end_mc: endMC || null,
-        entity_type: entityType
+        entity_type: entityType,
+        workers: workers || 1,
+        incremental: incremental
     });
 }
 
@@ -79,6 +85,12 @@ function handleScrapingStarted(data) {
     showSuccess(data.message);
 }
 
+function handleJobQueued(data) {
+    currentStatus.innerHTML = '<i class="fas fa-hourglass-half me-2"></i>Waiting in queue...';
+    currentStatus.className = 'status-processing';
+    progressInfo.textContent = data.message;
+}
+
 function handleScrappingStopped(data) {
     scrapingActive = false;
     updateButtonStates();
@@ -101,12 +113,23 @@ function handleProgressUpdate(data) {
     if (scrapingActive) {
         currentStatus.innerHTML = `<i class="fas fa-search me-2"></i>Checking MC ${data.current_mc}`;
         currentStatus.className = 'status-processing';
-        progressInfo.textContent = data.status;
+        const counts = data.counts || {};
+        progressInfo.textContent = `${data.status} | ${counts.valid || 0} valid, ${counts.invalid || 0} filtered, ` +
+            `${counts.not_found || 0} not found, ` + (counts.unchanged ? `${counts.unchanged} unchanged, ` : '') +
+            (counts.skipped ? `${counts.skipped} skipped, ` : '') +
+            `${counts.error || 0} errors | ${data.rate} MC/s`;
     }
+    updateRateInfo(data.rates);
+}
+
+function updateRateInfo(rates) {
+    if (!rates) return;
+    const parts = Object.entries(rates).map(([host, rate]) => `${host}: ${rate.toFixed(2)} req/s`);
+    rateInfo.textContent = parts.join(' | ');
 }
 
 function handleDataUpdate(data) {
-    addDataToTable(data.data);
+    (data.records || []).forEach(addDataToTable);
     dataCount = data.total_count;
     updateRecordCounts();
     updateExportButtons();
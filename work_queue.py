@@ -0,0 +1,334 @@
+"""Leased work units for sharding MC ranges across scraper nodes.
+
+A coordinator splits a range into fixed-size units in a shared queue. Each
+node claims a unit, which leases it for lease_seconds, and renews the lease
+while it works, reporting records and a checkpoint as it goes. If a node
+stops renewing (crash, redeploy, lost network), its lease expires and the
+next claim hands the unit to another node, which resumes after the
+checkpoint. Every call that changes a unit carries the lease token, so a
+node that lost its lease can't report into a unit someone else now owns.
+Records are keyed by MC number, so rescanning part of a unit never
+duplicates results.
+
+Backends are chosen by URL scheme with open_work_queue(). SQLite
+(sqlite:///path/to/work.db) works for a single host or a shared volume.
+Other stores can be added with register_backend(scheme, factory); a backend
+implements add_range, claim, renew, report, complete, release, stats and
+iter_results like SQLiteWorkQueue.
+
+    python work_queue.py add 100000 900000 --unit-size 2000
+    python work_queue.py status
+    python work_queue.py export > records.jsonl
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from carrier_record import record_to_json
+
+DEFAULT_QUEUE_URL = 'sqlite:///instance/work_queue.db'
+DEFAULT_LEASE_SECONDS = 120.0
+
+# Units that keep failing (e.g. a range that crashes every node) stop being handed out
+MAX_ATTEMPTS = 5
+
+BACKENDS = {}
+
+
+def register_backend(scheme, factory):
+    """Make open_work_queue() accept scheme://... URLs; factory(url) returns the queue"""
+    BACKENDS[scheme] = factory
+
+
+def open_work_queue(url=None):
+    """Open the work queue at url (default SCRAPER_WORK_QUEUE or a local SQLite file)"""
+    url = url or os.getenv('SCRAPER_WORK_QUEUE', DEFAULT_QUEUE_URL)
+    scheme = url.split('://', 1)[0] if '://' in url else 'sqlite'
+    factory = BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unknown work queue backend '{scheme}' (available: {', '.join(sorted(BACKENDS))})")
+    return factory(url)
+
+
+class WorkUnit:
+    """A leased slice of an MC range: scan max(start_mc, checkpoint_mc + 1)..end_mc"""
+
+    def __init__(self, unit_id, entity_type, start_mc, end_mc, checkpoint_mc, lease_token, attempts):
+        self.unit_id = unit_id
+        self.entity_type = entity_type
+        self.start_mc = start_mc
+        self.end_mc = end_mc
+        self.checkpoint_mc = checkpoint_mc
+        self.lease_token = lease_token
+        self.attempts = attempts
+
+    @property
+    def resume_mc(self):
+        if self.checkpoint_mc is None:
+            return self.start_mc
+        return max(self.start_mc, self.checkpoint_mc + 1)
+
+    def __repr__(self):
+        return f'WorkUnit({self.unit_id}, {self.entity_type} MC {self.start_mc}-{self.end_mc})'
+
+
+class SQLiteWorkQueue:
+    """Work queue in a SQLite file that every node opens.
+
+    Claims run in an IMMEDIATE transaction, so two nodes can't lease the same
+    unit even from separate processes.
+    """
+
+    def __init__(self, path='instance/work_queue.db'):
+        self.path = path
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Autocommit mode; transactions are opened explicitly where a claim needs one
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS work_units (
+                unit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity_type TEXT NOT NULL,
+                start_mc INTEGER NOT NULL,
+                end_mc INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                node_id TEXT,
+                lease_token TEXT,
+                lease_expires REAL,
+                checkpoint_mc INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                records INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                UNIQUE (entity_type, start_mc)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_work_units_status ON work_units (status, lease_expires)')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS work_results (
+                entity_type TEXT NOT NULL,
+                mc_int INTEGER NOT NULL,
+                unit_id INTEGER NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (entity_type, mc_int)
+            )
+        ''')
+
+    def add_range(self, start_mc, end_mc, entity_type, unit_size=1000):
+        """Split start_mc..end_mc into units; units that already exist are left alone. Returns units added."""
+        now = time.time()
+        rows = [
+            (entity_type, unit_start, min(unit_start + unit_size - 1, end_mc), now)
+            for unit_start in range(start_mc, end_mc + 1, unit_size)
+        ]
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO work_units (entity_type, start_mc, end_mc, updated_at) VALUES (?, ?, ?, ?)', rows
+            )
+            self.conn.execute('COMMIT')
+            return self.conn.total_changes - before
+
+    def claim(self, node_id, lease_seconds=DEFAULT_LEASE_SECONDS, entity_type=None):
+        """Lease the next pending or expired unit to node_id, or return None if there is none"""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute(
+                    "SELECT unit_id, entity_type, start_mc, end_mc, checkpoint_mc, attempts FROM work_units "
+                    "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) AND attempts < ? "
+                    "AND (? IS NULL OR entity_type = ?) ORDER BY status = 'leased', unit_id LIMIT 1",
+                    (now, MAX_ATTEMPTS, entity_type, entity_type)
+                ).fetchone()
+                if row is None:
+                    self.conn.execute('COMMIT')
+                    return None
+                self.conn.execute(
+                    "UPDATE work_units SET status = 'leased', node_id = ?, lease_token = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE unit_id = ?",
+                    (node_id, token, now + lease_seconds, now, row[0])
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return WorkUnit(row[0], row[1], row[2], row[3], row[4], token, row[5] + 1)
+
+    def renew(self, unit, lease_seconds=DEFAULT_LEASE_SECONDS, checkpoint_mc=None):
+        """Extend a lease, optionally moving the checkpoint. False means the lease was lost: stop work on the unit."""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE work_units SET lease_expires = ?, checkpoint_mc = COALESCE(?, checkpoint_mc), updated_at = ? "
+                "WHERE unit_id = ? AND lease_token = ? AND status = 'leased' AND lease_expires >= ?",
+                (now + lease_seconds, checkpoint_mc, now, unit.unit_id, unit.lease_token, now)
+            )
+        return cursor.rowcount == 1
+
+    def report(self, unit, records):
+        """Store a unit's records. False (nothing stored) if the lease was lost."""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if not self._holds_lease(unit):
+                    self.conn.execute('ROLLBACK')
+                    return False
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO work_results (entity_type, mc_int, unit_id, record) VALUES (?, ?, ?, ?)',
+                    [(unit.entity_type, int(record['mc_number']), unit.unit_id, record_to_json(record)) for record in records]
+                )
+                self.conn.execute(
+                    'UPDATE work_units SET records = (SELECT COUNT(*) FROM work_results WHERE unit_id = ?) '
+                    'WHERE unit_id = ?', (unit.unit_id, unit.unit_id)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return True
+
+    def complete(self, unit):
+        """Mark a unit done. False if the lease was lost, in which case another node finishes it."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE work_units SET status = 'done', checkpoint_mc = end_mc, lease_token = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE unit_id = ? AND lease_token = ? AND status = 'leased'",
+                (time.time(), unit.unit_id, unit.lease_token)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, unit, checkpoint_mc=None):
+        """Give a unit back unfinished (e.g. on shutdown) so it can be claimed again right away"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE work_units SET status = 'pending', node_id = NULL, lease_token = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), checkpoint_mc = COALESCE(?, checkpoint_mc), updated_at = ? "
+                "WHERE unit_id = ? AND lease_token = ? AND status = 'leased'",
+                (checkpoint_mc, time.time(), unit.unit_id, unit.lease_token)
+            )
+        return cursor.rowcount == 1
+
+    def _holds_lease(self, unit):
+        row = self.conn.execute(
+            "SELECT 1 FROM work_units WHERE unit_id = ? AND lease_token = ? AND status = 'leased' AND lease_expires >= ?",
+            (unit.unit_id, unit.lease_token, time.time())
+        ).fetchone()
+        return row is not None
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'expired' "
+                "WHEN status != 'done' AND attempts >= ? THEN 'failed' ELSE status END, COUNT(*), SUM(records) "
+                "FROM work_units GROUP BY 1", (now, MAX_ATTEMPTS)
+            ).fetchall()
+            nodes = self.conn.execute(
+                "SELECT node_id, COUNT(*) FROM work_units WHERE status = 'leased' AND lease_expires >= ? GROUP BY node_id",
+                (now,)
+            ).fetchall()
+        stats = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'failed': 0, 'records': 0}
+        for status, count, records in rows:
+            stats[status] = count
+            stats['records'] += records or 0
+        stats['nodes'] = dict(nodes)
+        return stats
+
+    def iter_results(self, entity_type=None, batch_size=1000):
+        """Yield stored records in MC order"""
+        last = ('', -1)
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    'SELECT entity_type, mc_int, record FROM work_results '
+                    'WHERE (entity_type, mc_int) > (?, ?) AND (? IS NULL OR entity_type = ?) '
+                    'ORDER BY entity_type, mc_int LIMIT ?',
+                    (last[0], last[1], entity_type, entity_type, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row[2])
+            last = (rows[-1][0], rows[-1][1])
+
+
+def _open_sqlite(url):
+    path = url.split('://', 1)[1] if '://' in url else url
+    # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy URLs
+    return SQLiteWorkQueue(path[1:] if path.startswith('/') else path)
+
+
+register_backend('sqlite', _open_sqlite)
+
+
+class NodeProgress:
+    """Tracks one unit's progress on a node: records to report and the contiguous checkpoint.
+
+    MC numbers finish out of order across workers, so the checkpoint only
+    moves past numbers once everything below them is done.
+    """
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.next_mc = unit.resume_mc
+        self.finished = set()
+        self.records = []
+        self.lock = threading.Lock()
+
+    def finish(self, mc_number, record=None):
+        with self.lock:
+            self.finished.add(mc_number)
+            while self.next_mc in self.finished:
+                self.finished.discard(self.next_mc)
+                self.next_mc += 1
+            if record is not None:
+                self.records.append(record)
+
+    def take(self):
+        """(records since the last take, checkpoint MC or None)"""
+        with self.lock:
+            records, self.records = self.records, []
+            checkpoint = self.next_mc - 1 if self.next_mc > self.unit.resume_mc else None
+        return records, checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the shared queue of MC range work units')
+    parser.add_argument('--queue', help=f'Queue URL (default: SCRAPER_WORK_QUEUE or {DEFAULT_QUEUE_URL})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='Split an MC range into work units')
+    add.add_argument('start_mc', type=int)
+    add.add_argument('end_mc', type=int)
+    add.add_argument('--unit-size', type=int, default=1000)
+    add.add_argument('--entity-type', default='Carrier', choices=['Carrier', 'Broker', 'Shipper'])
+    commands.add_parser('status', help='Show unit counts by status and active nodes')
+    export = commands.add_parser('export', help='Write collected records as JSON lines')
+    export.add_argument('--entity-type', choices=['Carrier', 'Broker', 'Shipper'])
+    args = parser.parse_args(argv)
+
+    queue = open_work_queue(args.queue)
+    if args.command == 'add':
+        added = queue.add_range(args.start_mc, args.end_mc, args.entity_type, args.unit_size)
+        print(f'Added {added} work units')
+    elif args.command == 'status':
+        print(json.dumps(queue.stats(), indent=2))
+    elif args.command == 'export':
+        for record in queue.iter_results(args.entity_type):
+            sys.stdout.write(json.dumps(record) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())